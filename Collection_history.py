@@ -0,0 +1,68 @@
+import argparse
+import json
+import time
+
+from collection_ledger import compact, last_entry
+from repository import Repository
+
+# Read the collection ledger: what was owned on a date, the change log of one
+# card or the latest changes overall, and compaction on demand (the importer
+# and the GUI compact on their own once enough entries pile up).
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collection change log and point-in-time inventory")
+    parser.add_argument("--at", help="show what was owned on a date (YYYY-MM-DD) or at an ISO timestamp")
+    parser.add_argument("--card", type=int, help="change log of one card_id")
+    parser.add_argument("--recent", type=int, default=0, help="list the latest N changes")
+    parser.add_argument("--compact", action="store_true", help="snapshot the ledger and repair Collection now")
+    parser.add_argument("--top", type=int, default=10, help="sets to list with --at")
+    parser.add_argument("--db", default="mtg_cards.db")
+    args = parser.parse_args()
+
+    repository = Repository(args.db)
+    conn = repository.conn
+    snapshots = conn.execute("SELECT COUNT(*) FROM CollectionSnapshots").fetchone()[0]
+    print(f"📜 {last_entry(conn):,} ledger entries, {snapshots:,} snapshots")
+
+    # === Compaction ===
+    if args.compact:
+        started = time.perf_counter()
+        snapshot_id, repaired = compact(conn)
+        elapsed = time.perf_counter() - started
+        print(f"🗜️ {'Snapshot ' + str(snapshot_id) if snapshot_id else 'No new entries'}, "
+              f"{repaired:,} Collection rows repaired in {elapsed * 1000:.0f} ms")
+
+    # === Point-in-time inventory ===
+    if args.at:
+        started = time.perf_counter()
+        quantities = repository.quantities_at(args.at)
+        elapsed = time.perf_counter() - started
+        print(f"\n📦 On {args.at}: {len(quantities):,} cards, {sum(quantities.values()):,} copies "
+              f"(rebuilt in {elapsed * 1000:.0f} ms)")
+        by_set = conn.execute("""
+            SELECT Sets.code, COUNT(*), SUM(owned.value) FROM json_each(?) AS owned
+            JOIN Cards ON Cards.card_id = CAST(owned.key AS INTEGER)
+            JOIN Sets ON Sets.set_id = Cards.set_id
+            GROUP BY Sets.code ORDER BY SUM(owned.value) DESC LIMIT ?
+        """, (json.dumps(quantities), args.top)).fetchall()
+        for code, cards, copies in by_set:
+            print(f"   {code.upper():<6} {cards:>6,} cards {copies:>8,} copies")
+
+    # === Change logs ===
+    if args.card is not None:
+        print(f"\n🃏 Card {args.card}:")
+        for recorded_at, delta, source in repository.card_history(args.card):
+            print(f"   {recorded_at.replace('T', ' ')}  {delta:+5d}  {source}")
+    if args.recent:
+        print(f"\n🕒 Latest {args.recent} changes:")
+        for recorded_at, name, code, delta, source in conn.execute("""
+            SELECT CollectionLedger.recorded_at, Cards.card_name, Sets.code, CollectionLedger.delta, CollectionLedger.source
+            FROM CollectionLedger
+            LEFT JOIN Cards ON Cards.card_id = CollectionLedger.card_id
+            LEFT JOIN Sets ON Sets.set_id = Cards.set_id
+            ORDER BY CollectionLedger.entry_id DESC LIMIT ?
+        """, (args.recent,)):
+            print(f"   {recorded_at.replace('T', ' ')}  {delta:+5d}  {name} ({(code or '?').upper()})  {source}")
+
+    repository.close()
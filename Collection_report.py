@@ -0,0 +1,26 @@
+import argparse
+import time
+
+from analytics import report_lines
+from repository import Repository
+
+# Print the collection's value, breakdowns and price movers from the local
+# PriceHistory (fill it with Snapshot_prices.py); never touches the network.
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collection valuation report")
+    parser.add_argument("--days", type=int, default=30, help="look-back window for price movers")
+    parser.add_argument("--top", type=int, default=10, help="number of gainers/losers to list")
+    parser.add_argument("--db", default="mtg_cards.db")
+    args = parser.parse_args()
+
+    repository = Repository(args.db)
+    started = time.perf_counter()
+    stats = repository.collection_value(args.days)
+    lines = report_lines(stats, args.top)
+    elapsed = time.perf_counter() - started
+    repository.close()
+
+    print("\n".join(lines))
+    print(f"\n⏱️ {len(stats)} cards analysed in {elapsed * 1000:.0f} ms")
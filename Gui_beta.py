@@ -1,32 +1,34 @@
-import sqlite3
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
-import requests
-from io import BytesIO
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
-
-# Connect to the SQLite database
-conn = sqlite3.connect("mtg_cards.db")
-cursor = conn.cursor()
-
-# Create a price history table if it doesn't exist
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS PriceHistory (
-        card_id INTEGER,
-        date TEXT,
-        usd_price REAL,
-        FOREIGN KEY (card_id) REFERENCES Cards(card_id)
-    )
-""")
-conn.commit()
+
+import instrument
+from detail_loader import DetailLoader, load_price
+from http_cache import default_cache
+from http_client import default_client
+from image_store import default_store
+from query_controller import QueryController
+from repository import Repository
+from resolver import CardResolver
+from virtual_tree import VirtualTreeview
+
+# matplotlib, NumPy, Pillow and requests are imported on first use (the chart
+# right after the window appears), so the window opens without waiting for them
+
+# MTG_PROFILE=file.prof profiles the Tk thread until the window closes
+instrument.start_profile()
+
+# Connect to the SQLite database (creates/upgrades the schema)
+repository = Repository("mtg_cards.db")
+resolver = CardResolver(repository)
 
 # Initialize the main window
 root = tk.Tk()
 root.title("MTG Card Collection")
 root.geometry("1000x600")
 
+# Worker pool that loads images and prices off the UI thread
+detail_loader = DetailLoader(root)
+
 # Frame for the card list and filters
 frame_left = ttk.Frame(root)
 frame_left.pack(side=tk.LEFT, fill=tk.Y, padx=10, pady=10)
@@ -38,6 +40,13 @@ frame_right.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10, pady=10)
 # Frame to embed matplotlib price chart
 chart_frame = tk.Frame(frame_right)
 chart_frame.pack(fill=tk.BOTH, expand=False, pady=(10, 0))
+price_chart = None
+
+def create_price_chart():
+    global price_chart
+    if price_chart is None:
+        from price_chart import PriceChart
+        price_chart = PriceChart(chart_frame)
 
 # Frame for filters
 filters_frame = ttk.Frame(frame_left)
@@ -58,13 +67,28 @@ search_var = tk.StringVar()
 search_entry = ttk.Entry(frame_left, textvariable=search_var)
 search_entry.pack(fill=tk.X, pady=(5, 0))
 
+# Collection totals, read from the trigger-kept summary row
+totals_label = ttk.Label(frame_left)
+totals_label.pack(side=tk.BOTTOM, fill=tk.X, pady=(5, 0))
+
 # Treeview to display the card list
+tree_frame = ttk.Frame(frame_left)
+tree_frame.pack(fill=tk.BOTH, expand=True)
 columns = ("Name", "Set", "Quantity", "Mana Cost", "Rarity")
-tree = ttk.Treeview(frame_left, columns=columns, show="headings", height=25)
+tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=25)
 for col in columns:
     tree.heading(col, text=col)
     tree.column(col, width=120)
-tree.pack(fill=tk.BOTH, expand=True)
+tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+tree_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL)
+tree_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+# Only the visible rows are ever inserted into the Treeview
+card_list = VirtualTreeview(tree, tree_scrollbar, repository.card_rows, height=25,
+                            on_sort=lambda: load_cards(search_var.get()))
+
+# Filter changes are debounced and queried off the UI thread
+query_controller = QueryController(root, "mtg_cards.db", card_list.set_ids)
 
 # Image label to display card art
 image_label = ttk.Label(frame_right)
@@ -85,6 +109,15 @@ tk.Button(editor_frame, text="💾 Save", command=lambda: update_quantity()).pac
 #Add Card button  
 add_button = tk.Button(editor_frame, text="➕ Add Card", command=lambda: open_add_popup())
 add_button.pack(side=tk.LEFT, padx=10)
+#Collection value button
+stats_button = tk.Button(editor_frame, text="📊 Collection Value", command=lambda: open_stats_window())
+stats_button.pack(side=tk.LEFT)
+#Change log of the selected card
+history_button = tk.Button(editor_frame, text="📜 History", command=lambda: open_history_window())
+history_button.pack(side=tk.LEFT, padx=10)
+#Stage timings (MTG_TRACE=1 or the checkbox in the window)
+timings_button = tk.Button(editor_frame, text="⏱️ Timings", command=lambda: open_timings_window())
+timings_button.pack(side=tk.LEFT)
 #pop up function 
 def open_add_popup():
     popup = tk.Toplevel(root)
@@ -107,108 +140,98 @@ def open_add_popup():
         collector_number = collector_entry.get().strip()
         quantity = int(quantity_entry.get().strip())
 
-        # Fetch card from Scryfall
-        api_url = f"https://api.scryfall.com/cards/{set_code}/{collector_number}"
-        response = requests.get(api_url)
-        if response.status_code != 200:
+        # Resolve from the local catalog, falling back to Scryfall
+        card_id = resolver.resolve(set_code, collector_number)
+        if card_id is None:
             tk.messagebox.showerror("Error", "Card not found on Scryfall.")
             popup.destroy()
             return
 
-        card = response.json()
-
-        # Extract details
-        card_name = card.get('name')
-        mana_cost = card.get('mana_cost')
-        cmc = card.get('cmc')
-        power = card.get('power')
-        toughness = card.get('toughness')
-        loyalty = card.get('loyalty')
-        rarity = card.get('rarity').capitalize() if card.get('rarity') else None
-        type_line = card.get('type_line')
-        oracle_text = card.get('oracle_text')
-        flavor_text = card.get('flavor_text')
-        artist = card.get('artist')
-        image_url = card.get('image_uris', {}).get('normal') if card.get('image_uris') else None
-
-        set_name = card.get('set_name')
-        release_date = card.get('released_at')
-
-        # Insert or get set
-        cursor.execute("SELECT set_id FROM Sets WHERE code = ?", (set_code,))
-        set_row = cursor.fetchone()
-        if set_row:
-            set_id = set_row[0]
-        else:
-            cursor.execute("INSERT INTO Sets (set_name, code, release_date) VALUES (?, ?, ?)", (set_name, set_code, release_date))
-            set_id = cursor.lastrowid
-
-        # Insert card
-        cursor.execute("""
-            INSERT OR IGNORE INTO Cards (
-                card_name, mana_cost, cmc, power, toughness, loyalty,
-                rarity, set_id, type_line, oracle_text, flavor_text,
-                artist, image_url
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            card_name, mana_cost, cmc, power, toughness, loyalty,
-            rarity, set_id, type_line, oracle_text, flavor_text,
-            artist, image_url
-        ))
-
-        # Get card_id
-        cursor.execute("SELECT card_id FROM Cards WHERE card_name = ? AND set_id = ?", (card_name, set_id))
-        card_id = cursor.fetchone()[0]
-
         # Insert into collection
-        cursor.execute("INSERT INTO Collection (card_id, quantity) VALUES (?, ?) ON CONFLICT(card_id) DO UPDATE SET quantity = quantity + ?", (card_id, quantity, quantity))
-        conn.commit()
+        repository.add_to_collection(card_id, quantity)
 
         popup.destroy()
-        load_cards()  # Refresh the list
+        load_cards(search_var.get(), force=True)  # Refresh the list
+        refresh_summary()
 
     tk.Button(popup, text="Add", command=submit).grid(row=3, columnspan=2, pady=10)
 
 
-def populate_filters():
-    # Populate set dropdown
-    cursor.execute("SELECT DISTINCT code FROM Sets ORDER BY code")
-    sets = ["All Sets"] + [row[0] for row in cursor.fetchall()]
-    set_dropdown['values'] = sets
-    set_var.set("All Sets")
+def open_stats_window():
+    # Valuation report from local prices only (see Snapshot_prices.py)
+    from analytics import report_lines
+    window = tk.Toplevel(root)
+    window.title("Collection Value")
+    text = tk.Text(window, width=90, height=40, font=("Courier", 10))
+    text.pack(fill=tk.BOTH, expand=True)
+    text.insert(tk.END, "\n".join(report_lines(repository.collection_value())))
+    text.configure(state=tk.DISABLED)
 
-    # Populate rarity dropdown
-    cursor.execute("SELECT DISTINCT rarity FROM Cards WHERE rarity IS NOT NULL ORDER BY rarity")
-    rarities = ["All Rarities"] + [row[0] for row in cursor.fetchall()]
-    rarity_dropdown['values'] = rarities
-    rarity_var.set("All Rarities")
 
-def load_cards(filter_text=""):
-    tree.delete(*tree.get_children())
-    
-    query = """
-        SELECT Cards.card_id, Cards.card_name, Sets.code, Collection.quantity,Cards.mana_cost, Cards.rarity, Cards.image_url
-        FROM Cards
-        JOIN Sets ON Cards.set_id = Sets.set_id
-        JOIN Collection ON Cards.card_id = Collection.card_id
-        WHERE Cards.card_name LIKE ?
-    """
-    params = [f"%{filter_text}%"]
+def open_history_window():
+    # Every quantity change of the selected card, newest first, from the collection ledger
+    selected = tree.focus()
+    if not selected:
+        print("No card selected.")
+        return
+    card_id = int(tree.item(selected, "tags")[0])
+    card_name, set_code = tree.item(selected, "values")[:2]
+    window = tk.Toplevel(root)
+    window.title(f"History: {card_name} ({set_code.upper()})")
+    text = tk.Text(window, width=70, height=20, font=("Courier", 10))
+    text.pack(fill=tk.BOTH, expand=True)
+    lines = [f"{recorded_at.replace('T', ' ')}  {delta:+5d}  {source}"
+             for recorded_at, delta, source in repository.card_history(card_id)]
+    text.insert(tk.END, "\n".join(lines) or "No changes recorded.")
+    text.configure(state=tk.DISABLED)
+
+
+def open_timings_window():
+    # Per-stage counts and latencies recorded by instrument.span()
+    window = tk.Toplevel(root)
+    window.title("Timings")
+    controls = tk.Frame(window)
+    controls.pack(fill=tk.X)
+    recording = tk.BooleanVar(value=instrument.ENABLED)
+    histograms = tk.BooleanVar(value=False)
+    text = tk.Text(window, width=95, height=30, font=("Courier", 10))
+    text.pack(fill=tk.BOTH, expand=True)
+
+    def refresh():
+        text.configure(state=tk.NORMAL)
+        text.delete("1.0", tk.END)
+        text.insert(tk.END, "\n".join(instrument.report_lines(histograms.get())))
+        text.configure(state=tk.DISABLED)
+
+    def reset():
+        instrument.reset()
+        refresh()
+
+    tk.Checkbutton(controls, text="Record", variable=recording,
+                   command=lambda: instrument.enable(recording.get())).pack(side=tk.LEFT)
+    tk.Checkbutton(controls, text="Histograms", variable=histograms, command=refresh).pack(side=tk.LEFT)
+    tk.Button(controls, text="🔄 Refresh", command=refresh).pack(side=tk.LEFT, padx=5)
+    tk.Button(controls, text="🧹 Reset", command=reset).pack(side=tk.LEFT)
+    refresh()
 
-    if set_var.get() != "All Sets":
-        query += " AND Sets.code = ?"
-        params.append(set_var.get())
 
-    if rarity_var.get() != "All Rarities":
-        query += " AND Cards.rarity = ?"
-        params.append(rarity_var.get())
+def populate_filters():
+    refresh_summary()
+    set_var.set("All Sets")
+    rarity_var.set("All Rarities")
 
-    query += " ORDER BY Cards.card_name"
+def refresh_summary():
+    # Filter values and totals come from the summary tables, so this stays
+    # cheap however large the collection is; rerun after every edit
+    set_dropdown['values'] = ["All Sets"] + repository.set_codes()
+    rarity_dropdown['values'] = ["All Rarities"] + repository.rarities()
+    cards, copies, sets = repository.totals()
+    totals_label.config(text=f"📦 {cards:,} cards, {copies:,} copies from {sets:,} sets")
 
-    cursor.execute(query, params)
-    for row in cursor.fetchall():
-        card_id, name, set_code, quantity, mana_cost, rarity, image_url = row
-        tree.insert("", "end", values=(name, set_code, quantity, mana_cost, rarity), tags=(card_id, image_url))
+def load_cards(filter_text="", force=False, keep_position=False):
+    # Debounced; the query runs in the background and fills card_list
+    filters = (filter_text, set_var.get(), rarity_var.get(), card_list.sort_column, card_list.sort_desc)
+    query_controller.request(filters, force, keep_position)
 
 
 def on_card_select(event):
@@ -223,65 +246,62 @@ def on_card_select(event):
     card_id, image_url = tags
     card_id = int(card_id)
 
+    with instrument.span("gui.select"):
+        select_card(selected, card_id, image_url)
+
+def select_card(selected, card_id, image_url):
     # Show price chart
     show_price_chart(card_id)
 
     # Load quantity for editor
-    cursor.execute("SELECT quantity FROM Collection WHERE card_id = ?", (card_id,))
-    row = cursor.fetchone()
-    quantity_var.set(row[0] if row else 0)
+    quantity_var.set(repository.quantity(card_id))
+
+    # Card name and set code for the price lookup
+    card_name, set_code = tree.item(selected, "values")[:2]
 
-    # Load card image
+    # Image and price load in the background; anything still running for the
+    # previous selection is cancelled
+    detail_loader.select()
     if image_url:
-        try:
-            img_data = requests.get(image_url).content
-            img = Image.open(BytesIO(img_data)).resize((250, 350))
-            photo = ImageTk.PhotoImage(img)
-            image_label.configure(image=photo, text="")
-            image_label.image = photo
-        except Exception as e:
-            image_label.configure(text="⚠️ Failed to load image", image="")
-            print(e)
-
-    # Fetch live price
-    cursor.execute("SELECT set_id FROM Cards WHERE card_id = ?", (card_id,))
-    set_id = cursor.fetchone()[0]
-    cursor.execute("SELECT code FROM Sets WHERE set_id = ?", (set_id,))
-    set_code = cursor.fetchone()[0]
-    cursor.execute("SELECT card_name FROM Cards WHERE card_id = ?", (card_id,))
-    card_name = cursor.fetchone()[0]
-
-    api_url = f"https://api.scryfall.com/cards/named?exact={card_name}&set={set_code}"
-    try:
-        r = requests.get(api_url)
-        data = r.json()
-        price = data.get("prices", {}).get("usd")
-        price_label.config(text=f"💵 USD Price: ${price}" if price else "No price found.")
-    except Exception as e:
-        price_label.config(text="⚠️ Price fetch failed.")
-        print(e)
+        image_label.configure(text="⏳ Loading image...", image="")
+        detail_loader.submit(detail_loader.load_image, (card_id, image_url), show_image, show_image_error)
+    price_label.config(text="⏳ Fetching price...")
+    detail_loader.submit(load_price, (card_name, set_code), show_price, show_price_error)
+
+    # Prefetch the neighbouring rows so arrowing through the list is instant
+    for neighbour in (tree.next(selected), tree.prev(selected)):
+        if not neighbour:
+            continue
+        neighbour_tags = tree.item(neighbour, "tags")
+        neighbour_name, neighbour_set = tree.item(neighbour, "values")[:2]
+        if len(neighbour_tags) == 2 and neighbour_tags[1]:
+            detail_loader.prefetch(detail_loader.load_image, int(neighbour_tags[0]), neighbour_tags[1])
+        detail_loader.prefetch(load_price, neighbour_name, neighbour_set)
+
+def show_image(img):
+    from PIL import ImageTk
+    photo = ImageTk.PhotoImage(img)
+    image_label.configure(image=photo, text="")
+    image_label.image = photo
+
+def show_image_error(e):
+    image_label.configure(text="⚠️ Failed to load image", image="")
+    print(e)
+
+def show_price(price):
+    price_label.config(text=f"💵 USD Price: ${price}" if price else "No price found.")
+
+def show_price_error(e):
+    price_label.config(text="⚠️ Price fetch failed.")
+    print(e)
 
 def show_price_chart(card_id):
-    # Clear existing chart
-    for widget in chart_frame.winfo_children():
-        widget.destroy()
-
-    cursor.execute("SELECT date, usd_price FROM PriceHistory WHERE card_id = ? ORDER BY date", (card_id,))
-    rows = cursor.fetchall()
-    if not rows:
-        return
-
-    dates, prices = zip(*rows)
-    fig, ax = plt.subplots(figsize=(4, 3))
-    ax.plot(dates, prices, marker='o')
-    ax.set_title("Price Over Time")
-    ax.set_xlabel("Date")
-    ax.set_ylabel("USD Price")
-    ax.tick_params(axis='x', rotation=45)
-
-    canvas = FigureCanvasTkAgg(fig, master=chart_frame)
-    canvas.draw()
-    canvas.get_tk_widget().pack()
+    # At most a few hundred points whatever the length of the history; the
+    # chart keeps its figure and only swaps the line data
+    create_price_chart()
+    with instrument.span("gui.chart"):
+        dates, prices = repository.price_series(card_id)
+        price_chart.show(dates, prices)
 
 def update_quantity():
     selected = tree.focus()
@@ -292,9 +312,9 @@ def update_quantity():
     card_id = int(tree.item(selected, "tags")[0])
     new_quantity = quantity_var.get()
 
-    cursor.execute("UPDATE Collection SET quantity = ? WHERE card_id = ?", (new_quantity, card_id))
-    conn.commit()
-    load_cards(search_var.get())
+    repository.set_quantity(card_id, new_quantity)
+    load_cards(search_var.get(), force=True, keep_position=True)
+    refresh_summary()
     print(f"✅ Updated quantity to {new_quantity}")
 
 # Reactive filtering on type/search input
@@ -305,9 +325,20 @@ rarity_var.trace("w", lambda *args: load_cards(search_var.get()))
 # Bind events
 set_dropdown.bind("<<ComboboxSelected>>", lambda e: load_cards(search_var.get()))
 rarity_dropdown.bind("<<ComboboxSelected>>", lambda e: load_cards(search_var.get()))
-tree.bind("<<TreeviewSelect>>", on_card_select)
+card_list.bind_select(on_card_select)
 
 # Final setup
 populate_filters()
 load_cards()
+# Build the chart once the window is on screen rather than before it
+root.after_idle(create_price_chart)
 root.mainloop()
+detail_loader.shutdown()
+query_controller.shutdown()
+repository.compact()
+instrument.stop_profile()
+print(default_cache().summary())
+print(default_store().summary())
+print(default_client().summary())
+if instrument.summary():
+    print(instrument.summary())
@@ -0,0 +1,45 @@
+import argparse
+import time
+
+from catalog import load_bulk
+from http_client import default_client
+from migrations import connect
+from scryfall import API_BASE
+
+# Build or refresh the offline card catalog in mtg_cards.db from a Scryfall
+# bulk-data file (https://scryfall.com/docs/api/bulk-data).
+
+
+def download_bulk(bulk_type, path):
+    client = default_client()
+    info = client.get(f"{API_BASE}/bulk-data/{bulk_type}").json()
+    print(f"🌐 Downloading {info['download_uri']} ({info.get('size', 0) / 1e6:.0f} MB)")
+    with client.get(info['download_uri'], stream=True) as response:
+        response.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load a Scryfall bulk dump into the local card catalog")
+    parser.add_argument("path", nargs="?", default="default-cards.json", help="bulk JSON file (.json or .json.gz)")
+    parser.add_argument("--download", action="store_true", help="fetch the latest dump to PATH first")
+    parser.add_argument("--type", default="default-cards", help="bulk data type used with --download")
+    parser.add_argument("--db", default="mtg_cards.db")
+    args = parser.parse_args()
+
+    if args.download:
+        download_bulk(args.type, args.path)
+
+    conn = connect(args.db)
+    started = time.monotonic()
+
+    def progress(seen):
+        elapsed = time.monotonic() - started
+        print(f"\r📦 {seen} cards ({seen / elapsed:.0f}/s)", end="", flush=True)
+
+    seen, written = load_bulk(conn, args.path, progress=progress)
+    conn.close()
+    print(f"\n✅ Catalog loaded: {seen} cards read, {written} rows written in {time.monotonic() - started:.1f}s")
@@ -0,0 +1,101 @@
+import argparse
+import csv
+import os
+import time
+
+from card_matcher import CardMatcher, Match, normalize_set
+from import_journal import read_csv
+from importer import MIN_CONFIDENCE, parse_row, row_label
+from migrations import connect
+
+# Match a messy intake list (buylist export, scanner app CSV) against the
+# local catalog without importing it. Only a name column is required;
+# set_code/set, collector_number and quantity are used when present.
+# Writes a copy with canonical set codes and collector numbers that
+# Import_csv_current takes as is, plus status, confidence and the candidate
+# printings of every row that needs a look. Rows whose quantity cannot be
+# read ("1/2", "two") keep their candidates but are marked "bad quantity".
+
+OUTPUT_FIELDS = [
+    "name", "set_code", "collector_number", "quantity",
+    "status", "confidence", "card_id", "matched_name", "candidates",
+]
+
+
+def output_row(name, set_code, collector_number, quantity, match, min_confidence):
+    row = {
+        "name": name, "set_code": set_code, "collector_number": collector_number, "quantity": quantity,
+        "status": match.status, "confidence": f"{match.confidence:.2f}", "card_id": "", "matched_name": "",
+        "candidates": "; ".join(row_label(*candidate[1:]) for candidate in match.candidates),
+    }
+    if match.accepted(min_confidence):
+        _, matched_name, code, number = match.candidates[0]
+        row.update(set_code=code, collector_number=number, card_id=match.card_id, matched_name=matched_name)
+    return row
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Match a messy card list against the local catalog")
+    parser.add_argument("csv_path")
+    parser.add_argument("--output", help="matched CSV (default: <name>_matched.csv next to the input)")
+    parser.add_argument("--min-confidence", type=float, default=MIN_CONFIDENCE,
+                        help="fuzzy matches below this are left for review")
+    parser.add_argument("--alias", action="append", default=[], metavar="ALIAS=CODE",
+                        help="remember another name for a set code, e.g. --alias 'core 2021=m21'")
+    parser.add_argument("--show", type=int, default=20, help="rows needing review to list")
+    parser.add_argument("--db", default="mtg_cards.db")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+
+    # === Store new set aliases before the index is built ===
+    for alias in args.alias:
+        text, _, code = alias.partition("=")
+        conn.execute("INSERT OR REPLACE INTO SetAliases (alias, code) VALUES (?, ?)",
+                     (normalize_set(text), normalize_set(code)))
+    conn.commit()
+
+    started = time.perf_counter()
+    matcher = CardMatcher(conn)
+    indexed = time.perf_counter() - started
+    print(f"📚 Indexed {len(matcher.printings):,} printings and {len(matcher.names):,} names in {indexed:.2f}s")
+
+    # === Match every row ===
+    raw = [row for row, _ in read_csv(args.csv_path, 0)]
+    rows = [parse_row(row) for row in raw]
+    started = time.perf_counter()
+    matches, counts = matcher.match_rows([row[:3] for row in rows])
+    elapsed = time.perf_counter() - started
+    for i, row in enumerate(rows):
+        if row[3] is None:
+            counts[matches[i].status] -= 1
+            counts["bad quantity"] = counts.get("bad quantity", 0) + 1
+            matches[i] = Match("bad quantity", candidates=matches[i].candidates)
+            rows[i] = row[:3] + (raw[i].get("quantity"),)
+
+    output = args.output or os.path.splitext(args.csv_path)[0] + "_matched.csv"
+    review = []
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, OUTPUT_FIELDS)
+        writer.writeheader()
+        for row, match in zip(rows, matches):
+            writer.writerow(output_row(*row, match, args.min_confidence))
+            if not match.accepted(args.min_confidence):
+                review.append((row, match))
+    conn.close()
+
+    # === Summary ===
+    print(f"⏱️ {len(rows):,} rows matched in {elapsed:.2f}s ({elapsed * 1e6 / max(len(rows), 1):.0f} µs/row)")
+    for status in ("exact", "fuzzy", "ambiguous", "unmatched", "bad quantity"):
+        print(f"   {status:<12} {counts.get(status, 0):>8,}")
+    print(f"📝 Wrote {output}")
+
+    if review:
+        print(f"\n⚠️ {len(review):,} rows need review (below {args.min_confidence:.0%}, ambiguous, unmatched "
+              f"or bad quantity):")
+        for (name, set_code, collector_number, _), match in review[:args.show]:
+            candidates = ", ".join(row_label(*candidate[1:]) for candidate in match.candidates[:3])
+            print(f"   {row_label(name, set_code, collector_number)}: {match.status} "
+                  f"{match.confidence:.0%} -> {candidates or 'no candidates'}")
+        if len(review) > args.show:
+            print(f"   ... and {len(review) - args.show:,} more in {output}")
@@ -0,0 +1,48 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from http_client import default_client
+from image_store import default_store
+from repository import Repository
+
+# Fill the image store with thumbnails for every card in the collection so
+# the GUI can browse it offline. Downloads run in parallel; cards already
+# stored with the same image URL are skipped, so reruns only fetch what is new.
+# Connections are kept alive and retried by the shared HTTP client.
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download and resize card images for the whole collection")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--db", default="mtg_cards.db")
+    args = parser.parse_args()
+
+    repository = Repository(args.db)
+    cards = repository.collection_images()
+    repository.close()
+
+    store = default_store()
+    stored = store.stored_ids()
+    wanted = [(card_id, url) for card_id, url in cards if stored.get(card_id) != url]
+    print(f"🖼️ {len(cards) - len(wanted)} of {len(cards)} images already stored, fetching {len(wanted)}")
+
+    started = time.monotonic()
+    done = failed = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(store.fetch, card_id, url) for card_id, url in wanted]
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                print(f"\n⚠️ Image failed: {e}")
+            done += 1
+            elapsed = time.monotonic() - started
+            print(f"\r📥 {done}/{len(wanted)} ({done / elapsed:.1f}/s)", end="", flush=True)
+
+    print(f"\n✅ {done - failed} images stored, {failed} failed in {time.monotonic() - started:.1f}s")
+    print(store.summary())
+    print(default_client().summary(histogram=True))
+    if store.evictions:
+        print("⚠️ The image budget is smaller than the collection; raise MTG_IMAGE_STORE_MB to keep every image")
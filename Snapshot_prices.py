@@ -0,0 +1,43 @@
+import argparse
+import datetime
+
+from Load_bulk_data import download_bulk
+from migrations import connect
+from price_history import api_prices, bulk_file_date, bulk_prices, write_snapshot
+from scryfall import FetchStats
+
+# Record today's USD price of every card in the collection into PriceHistory,
+# or backfill earlier days from archived Scryfall bulk files. Safe to run
+# more than once a day (e.g. from cron): each day is stored once per card.
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot collection prices into PriceHistory")
+    parser.add_argument("bulk", nargs="*", help="bulk JSON files to read prices from (.json or .json.gz)")
+    parser.add_argument("--download", action="store_true", help="fetch today's default-cards dump and read prices from it")
+    parser.add_argument("--date", help="snapshot date (YYYY-MM-DD); defaults to the bulk file's timestamp or today")
+    parser.add_argument("--db", default="mtg_cards.db")
+    args = parser.parse_args()
+
+    today = datetime.date.today().isoformat()
+    if args.download:
+        args.bulk.append(download_bulk("default-cards", f"default-cards-{today.replace('-', '')}000000.json"))
+    if args.date and len(args.bulk) > 1:
+        parser.error("--date only applies to a single snapshot")
+
+    conn = connect(args.db)
+
+    if not args.bulk:
+        stats = FetchStats()
+        prices, owned = api_prices(conn, stats)
+        written = write_snapshot(conn, args.date or today, prices)
+        print(stats.summary())
+        print(f"✅ {args.date or today}: {written} of {owned} cards priced")
+
+    for path in args.bulk:
+        date = args.date or bulk_file_date(path) or today
+        prices, owned = bulk_prices(conn, path)
+        written = write_snapshot(conn, date, prices)
+        print(f"✅ {date}: {written} of {owned} cards priced from {path}")
+
+    conn.close()
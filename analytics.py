@@ -0,0 +1,170 @@
+import datetime
+import json
+
+import numpy as np
+
+from catalog import COLOR_NAMES
+
+# Whole-collection valuation. One query loads every owned card with its
+# latest and past price into NumPy columns; totals, breakdowns, movers and
+# distributions are then array operations over those columns, not SQL
+# round trips or Python loops per card.
+
+# Latest and past prices are per-card index seeks on PriceHistory(card_id, date).
+# Only numbers are loaded per card (set and color ids, not names) to keep
+# the row decoding cheap; names are looked up for the few rows reported.
+COLLECTION_SQL = """
+    SELECT Collection.card_id, Collection.quantity, Cards.set_id, COALESCE(Cards.rarity, 'Unknown'),
+           (SELECT SUM(1 << color_id) FROM Card_CardColors
+            WHERE Card_CardColors.card_id = Collection.card_id),
+           (SELECT usd_price FROM PriceHistory
+            WHERE PriceHistory.card_id = Collection.card_id
+            ORDER BY date DESC LIMIT 1),
+           (SELECT usd_price FROM PriceHistory
+            WHERE PriceHistory.card_id = Collection.card_id AND date <= ?
+            ORDER BY date DESC LIMIT 1)
+    FROM Collection
+    JOIN Cards ON Collection.card_id = Cards.card_id
+    WHERE Collection.quantity > 0
+"""
+
+
+class CollectionValue:
+    def __init__(self, conn, days=30):
+        # days: look-back for movers; past prices are the latest on or before it
+        self.conn = conn
+        self.days = days
+        cutoff = (datetime.date.today() - datetime.timedelta(days=days)).isoformat()
+        rows = conn.execute(COLLECTION_SQL, (cutoff,)).fetchall()
+        columns = list(zip(*rows)) or [()] * 7
+        self.card_ids = np.array(columns[0], dtype=np.int64)
+        self.quantity = np.array(columns[1], dtype=np.int64)
+        self.set_ids = np.array(columns[2], dtype=np.int64)
+        self.rarity = np.array(columns[3], dtype=object)
+        # Bit (1 << color_id) for every color of the card
+        self.colors = np.array([mask or 0 for mask in columns[4]], dtype=np.int64)
+        # Missing prices become NaN and count as zero value
+        self.price = np.array(columns[5], dtype=float)
+        self.past_price = np.array(columns[6], dtype=float)
+        self.value = self.quantity * np.nan_to_num(self.price)
+
+        self.set_codes = dict(conn.execute("SELECT set_id, code FROM Sets"))
+        self.color_bits = {
+            name: 1 << color_id
+            for color_id, name in conn.execute("SELECT color_id, color_name FROM CardColors")
+            if name in COLOR_NAMES.values()
+        }
+
+    def __len__(self):
+        return len(self.card_ids)
+
+    def total_value(self):
+        return float(self.value.sum())
+
+    def total_copies(self):
+        return int(self.quantity.sum())
+
+    def priced_share(self):
+        # Fraction of copies that have a price
+        copies = self.total_copies()
+        return float(self.quantity[~np.isnan(self.price)].sum() / copies) if copies else 0.0
+
+    def _grouped(self, keys, groups):
+        values = np.bincount(groups, weights=self.value, minlength=len(keys))
+        copies = np.bincount(groups, weights=self.quantity, minlength=len(keys))
+        order = np.argsort(-values, kind="stable")
+        return [(keys[i], float(values[i]), int(copies[i])) for i in order]
+
+    def value_by_set(self):
+        # [(set code, value, copies)], most valuable first
+        set_ids, groups = np.unique(self.set_ids, return_inverse=True)
+        return self._grouped([self.set_codes.get(int(i), "?") for i in set_ids], groups)
+
+    def value_by_rarity(self):
+        rarities, groups = np.unique(self.rarity.astype(str), return_inverse=True)
+        return self._grouped(list(rarities), groups)
+
+    def value_by_color(self):
+        # Multicolored cards count towards each of their colors
+        result = []
+        for name, bit in self.color_bits.items():
+            has = (self.colors & bit) != 0
+            result.append((name, float(self.value[has].sum()), int(self.quantity[has].sum())))
+        colorless = (self.colors & sum(self.color_bits.values())) == 0
+        result.append(("Colorless", float(self.value[colorless].sum()), int(self.quantity[colorless].sum())))
+        return sorted(result, key=lambda row: -row[1])
+
+    def top_movers(self, n=10):
+        # (gainers, losers) as [(card_name, set, past, latest, change per copy)]
+        # by change in held value over the look-back window
+        known = ~(np.isnan(self.price) | np.isnan(self.past_price))
+        idx = np.flatnonzero(known)
+        held_change = (self.price[idx] - self.past_price[idx]) * self.quantity[idx]
+        order = idx[np.argsort(held_change, kind="stable")]
+
+        def rows(indices):
+            names = self.card_names([self.card_ids[i] for i in indices])
+            return [(names[int(self.card_ids[i])], self.set_codes.get(int(self.set_ids[i]), "?"),
+                     float(self.past_price[i]), float(self.price[i]),
+                     float(self.price[i] - self.past_price[i])) for i in indices]
+
+        gainers = [i for i in order[::-1][:n] if self.price[i] > self.past_price[i]]
+        losers = [i for i in order[:n] if self.price[i] < self.past_price[i]]
+        return rows(gainers), rows(losers)
+
+    def card_names(self, card_ids):
+        return dict(self.conn.execute(
+            "SELECT card_id, card_name FROM Cards WHERE card_id IN (SELECT value FROM json_each(?))",
+            (json.dumps([int(i) for i in card_ids]),)
+        ))
+
+    def price_distribution(self, bins=(0, 0.25, 1, 5, 20, 100, np.inf)):
+        # Copies and value per price band, weighted by quantity
+        priced = ~np.isnan(self.price)
+        price, quantity = self.price[priced], self.quantity[priced]
+        copies, _ = np.histogram(price, bins=bins, weights=quantity)
+        value, _ = np.histogram(price, bins=bins, weights=price * quantity)
+        return [(bins[i], bins[i + 1], int(copies[i]), float(value[i])) for i in range(len(copies))]
+
+    def weighted_percentiles(self, percentiles=(50, 90, 99)):
+        # Price of the median (etc.) copy, counting every copy rather than every card
+        priced = ~np.isnan(self.price)
+        price, quantity = self.price[priced], self.quantity[priced]
+        if not len(price):
+            return {p: 0.0 for p in percentiles}
+        order = np.argsort(price)
+        cumulative = np.cumsum(quantity[order])
+        positions = np.searchsorted(cumulative, np.array(percentiles) / 100 * cumulative[-1])
+        return {p: float(price[order][min(i, len(price) - 1)]) for p, i in zip(percentiles, positions)}
+
+
+def report_lines(stats, top=10, groups=15):
+    # Plain-text report shared by Collection_report.py and the GUI stats window
+    lines = [
+        f"💰 Total value: ${stats.total_value():,.2f} across {stats.total_copies():,} copies "
+        f"of {len(stats):,} cards ({stats.priced_share():.0%} priced)",
+        "",
+        "By set:",
+    ]
+    by_set = stats.value_by_set()
+    lines += [f"  {key:<8} ${value:>12,.2f}  {copies:>7,} copies" for key, value, copies in by_set[:groups]]
+    if len(by_set) > groups:
+        lines.append(f"  ... {len(by_set) - groups} more sets")
+    lines += ["", "By rarity:"]
+    lines += [f"  {key:<10} ${value:>12,.2f}  {copies:>7,} copies" for key, value, copies in stats.value_by_rarity()]
+    lines += ["", "By color:"]
+    lines += [f"  {key:<10} ${value:>12,.2f}  {copies:>7,} copies" for key, value, copies in stats.value_by_color()]
+
+    gainers, losers = stats.top_movers(top)
+    for title, movers in ((f"Top gainers ({stats.days} days):", gainers), (f"Top losers ({stats.days} days):", losers)):
+        lines += ["", title]
+        lines += [f"  {name} ({code}): ${past:,.2f} -> ${latest:,.2f} ({change:+,.2f})"
+                  for name, code, past, latest, change in movers] or ["  none"]
+
+    lines += ["", "Copies by price:"]
+    for low, high, copies, value in stats.price_distribution():
+        band = f"${low:g}+" if np.isinf(high) else f"${low:g}-{high:g}"
+        lines.append(f"  {band:<10} {copies:>7,} copies  ${value:>12,.2f}")
+    percentiles = stats.weighted_percentiles()
+    lines.append("  " + ", ".join(f"p{p} ${price:,.2f}" for p, price in percentiles.items()))
+    return lines
@@ -0,0 +1,90 @@
+import argparse
+import gc
+import sys
+import time
+import warnings
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from price_chart import PriceChart
+
+# Memory regression check for the price chart. Simulates many card selections
+# with the reusable PriceChart and with the old code (a new pyplot figure and
+# canvas per click, never closed), and reports resident memory growth and
+# time per selection. Exits non-zero when the reusable chart grows by more
+# than --max-growth-mb, so it can run in CI.
+
+
+def rss_mb():
+    # Peak resident set size. It never shrinks, so the reusable chart is
+    # measured first and a leak shows up as steady growth.
+    try:
+        import resource
+    except ImportError:  # Windows
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def fake_series(rng):
+    days = np.arange(rng.integers(2, 200)) * 7 + 19000
+    return days.astype("datetime64[D]"), rng.random(len(days)) * 20
+
+
+def old_chart(dates, prices):
+    # What show_price_chart did before: plt.subplots + a fresh canvas every time
+    fig, ax = plt.subplots(figsize=(4, 3))
+    ax.plot(dates, prices, marker='o')
+    ax.set_title("Price Over Time")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("USD Price")
+    ax.tick_params(axis='x', rotation=45)
+    canvas = FigureCanvasAgg(fig)
+    canvas.draw()
+
+
+def run(name, select, selections):
+    rng = np.random.default_rng(7)
+    # Warm up so one-off allocations (fonts, tick caches) do not count
+    for _ in range(10):
+        select(*fake_series(rng))
+    gc.collect()
+    baseline = rss_mb()
+    started = time.perf_counter()
+    for _ in range(selections):
+        select(*fake_series(rng))
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    growth = rss_mb() - baseline
+    print(f"📊 {name}: {growth:+.1f} MB after {selections} selections, "
+          f"{elapsed / selections * 1000:.1f} ms/selection, {len(plt.get_fignums())} pyplot figures open")
+    return growth
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Price chart memory use across repeated card selections")
+    parser.add_argument("--selections", type=int, default=200)
+    parser.add_argument("--max-growth-mb", type=float, default=5.0)
+    parser.add_argument("--skip-old", action="store_true", help="only measure the reusable chart")
+    args = parser.parse_args()
+
+    chart = PriceChart()
+    growth = run("reused PriceChart", chart.show, args.selections)
+
+    if not args.skip_old:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # pyplot warns after 20 open figures
+            run("new figure per selection", old_chart, args.selections)
+        plt.close("all")
+
+    if growth > args.max_growth_mb:
+        print(f"❌ Reused chart grew by {growth:.1f} MB (limit {args.max_growth_mb} MB)")
+        sys.exit(1)
+    print("✅ Reused chart memory is bounded")
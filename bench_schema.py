@@ -0,0 +1,92 @@
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from migrations import MIGRATIONS, migrate, secondary_indexes, tune
+from query_controller import card_query
+
+# Shows what the secondary indexes migration buys: builds a synthetic
+# mtg_cards.db without it, prints query plans and timings for the hot
+# queries, applies the migration and prints them again.
+
+# Last schema version before the secondary indexes
+BEFORE_INDEXES = next(number for number, migration in MIGRATIONS if migration is secondary_indexes) - 1
+
+RARITIES = ["Common", "Uncommon", "Rare", "Mythic"]
+
+
+def populate(conn, cards, days):
+    rng = random.Random(42)
+    conn.executemany(
+        "INSERT INTO Sets (set_name, code) VALUES (?, ?)",
+        [(f"Set {i}", f"s{i:03d}") for i in range(300)]
+    )
+    conn.executemany(
+        "INSERT INTO Cards (card_name, rarity, set_id, collector_number, scryfall_id, type_line) VALUES (?, ?, ?, ?, ?, ?)",
+        [(f"Card {i}", rng.choice(RARITIES), i % 300 + 1, str(i), f"id-{i}", "Creature — Elf") for i in range(cards)]
+    )
+    conn.executemany("INSERT INTO Collection VALUES (?, ?)", [(i, rng.randint(1, 4)) for i in range(1, cards + 1, 2)])
+    conn.executemany("INSERT INTO CardTypes (type_name) VALUES (?)", [(t,) for t in ("Creature", "Instant", "Sorcery", "Land")])
+    conn.executemany("INSERT INTO CardColors (color_name) VALUES (?)", [(c,) for c in "WUBRG"])
+    conn.executemany("INSERT INTO Card_CardTypes VALUES (?, ?)", [(i, i % 4 + 1) for i in range(1, cards + 1)])
+    conn.executemany("INSERT INTO Card_CardColors VALUES (?, ?)", [(i, i % 5 + 1) for i in range(1, cards + 1)])
+    priced = range(1, cards + 1, max(1, cards // 2000))
+    conn.executemany(
+        "INSERT INTO PriceHistory VALUES (?, date('2024-01-01', ?), ?)",
+        ((card_id, f"+{day} days", rng.random() * 20) for day in range(days) for card_id in priced)
+    )
+    conn.commit()
+
+
+def workload(cards):
+    return [
+        ("rarity filter", *card_query("", "All Sets", "Mythic")),
+        ("set filter", *card_query("", "s042", "All Rarities")),
+        ("price chart", "SELECT date, usd_price FROM PriceHistory WHERE card_id = ? ORDER BY date", [1]),
+        ("cards by type", "SELECT card_id FROM Card_CardTypes WHERE type_id = ?", [3]),
+        ("cards by color", "SELECT card_id FROM Card_CardColors WHERE color_id = ?", [2]),
+    ]
+
+
+def measure(conn, cards, repeat):
+    results = {}
+    for name, sql, params in workload(cards):
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = (statistics.median(timings), plan)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query plans and timings before/after the index migration")
+    parser.add_argument("--cards", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    conn = tune(sqlite3.connect(path))
+    migrate(conn, target=BEFORE_INDEXES)
+    print(f"🧪 Building {args.cards} cards with {args.days} days of prices in {path}")
+    populate(conn, args.cards, args.days)
+
+    before = measure(conn, args.cards, args.repeat)
+    started = time.perf_counter()
+    migrate(conn)
+    print(f"🛠️ Index migration took {time.perf_counter() - started:.2f}s")
+    after = measure(conn, args.cards, args.repeat)
+
+    for name in before:
+        (before_ms, before_plan), (after_ms, after_plan) = before[name], after[name]
+        print(f"\n📊 {name}: {before_ms:.2f} ms -> {after_ms:.2f} ms ({before_ms / max(after_ms, 1e-6):.1f}x)")
+        print("   before: " + " | ".join(before_plan))
+        print("   after:  " + " | ".join(after_plan))
+    conn.close()
@@ -0,0 +1,223 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_schema import populate
+from fake_scryfall import serve
+from migrations import connect
+from price_series import load_series, rebuild_series
+from query_controller import run_card_query
+
+# End-to-end benchmarks at several data sizes, saved as JSON so runs from
+# different versions can be compared:
+#   - importer: Import_csv_current on a synthetic CSV against the local fake
+#     Scryfall (fake_scryfall.py) with configurable latency and 429s;
+#     rows/s plus the requests the resolver made
+#   - card list: p50/p99 of the GUI's load_cards query on a synthetic db
+#   - price chart: p50/p99 of load_series
+# Usage: python bench_suite.py --sizes 1000,10000 --output results.json
+#        python bench_suite.py --compare old.json new.json
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+IMPORTER = os.path.join(HERE, "Import_csv_current")
+
+# (label, filters) as built by Gui_beta.load_cards
+CARD_LIST_FILTERS = [
+    ("all cards", ("", "All Sets", "All Rarities", None, False)),
+    ("name search", ("Card 12", "All Sets", "All Rarities", None, False)),
+    ("type search", ("elf warrior", "All Sets", "All Rarities", None, False)),
+    ("set filter", ("", "s042", "All Rarities", None, False)),
+    ("rarity filter", ("", "All Sets", "Mythic", None, False)),
+    ("sorted by quantity", ("", "All Sets", "All Rarities", "Quantity", True)),
+]
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return {
+        "p50_ms": round(statistics.median(timings) * 1000, 3),
+        "p99_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000, 3),
+    }
+
+
+def write_csv(path, rows, distinct):
+    # Store-intake style CSV: `distinct` printings repeated across `rows`
+    # lines. Returns the total quantity so the import can be checked.
+    rng = random.Random(rows)
+    copies = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("name,set_code,collector_number,quantity\n")
+        for i in range(rows):
+            card = rng.randrange(distinct)
+            set_code, number = f"b{card % 50:02d}", card // 50 + 1
+            quantity = rng.randint(1, 4)
+            copies += quantity
+            f.write(f"Card {set_code.upper()} {number},({set_code}),{number},{quantity}\n")
+    return copies
+
+
+def bench_import(size, args, workdir):
+    csv_path = os.path.join(workdir, f"import-{size}.csv")
+    expected = write_csv(csv_path, size, max(1, int(size * args.distinct)))
+    server = serve(args.port, args.latency, args.rate_limit)
+    env = dict(
+        os.environ,
+        SCRYFALL_API=f"http://127.0.0.1:{args.port}",
+        SCRYFALL_RATE=str(args.client_rate),
+        IMPORT_WORKERS=str(args.workers),
+        MTG_HTTP_CACHE=os.path.join(workdir, f"http_cache-{size}.db"),
+    )
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, IMPORTER], input=csv_path + "\n", cwd=workdir, env=env,
+        capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    server.server_close()
+    if result.returncode:
+        raise RuntimeError(f"importer failed:\n{result.stdout[-2000:]}\n{result.stderr[-2000:]}")
+
+    conn = connect(os.path.join(workdir, "mtg_cards.db"))
+    copies = conn.execute("SELECT COALESCE(SUM(quantity), 0) FROM Collection").fetchone()[0]
+    conn.close()
+    os.remove(os.path.join(workdir, "mtg_cards.db"))
+    if copies != expected:
+        print(f"⚠️ Imported {copies} copies, CSV holds {expected}")
+    return {
+        "rows": size,
+        "seconds": round(elapsed, 3),
+        "rows_per_s": round(size / elapsed, 1),
+        "requests": server.requests,
+        "throttled": server.throttled,
+        "copies_imported": copies,
+        "copies_expected": expected,
+    }
+
+
+def bench_queries(size, args, workdir):
+    path = os.path.join(workdir, f"cards-{size}.db")
+    conn = connect(path)
+    started = time.perf_counter()
+    populate(conn, size, args.days)
+    rebuild_series(conn)
+    build_seconds = time.perf_counter() - started
+
+    card_list, everything = {}, []
+    for label, filters in CARD_LIST_FILTERS:
+        timings = []
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            ids, _ = run_card_query(conn, filters)
+            timings.append(time.perf_counter() - t)
+        everything += timings
+        card_list[label] = dict(percentiles(timings), results=len(ids))
+    card_list["overall"] = percentiles(everything)
+
+    priced = [row[0] for row in conn.execute("SELECT DISTINCT card_id FROM PriceSeries")]
+    timings = []
+    for card_id in random.Random(1).choices(priced, k=args.repeat * 5) if priced else []:
+        t = time.perf_counter()
+        load_series(conn, card_id)
+        timings.append(time.perf_counter() - t)
+    conn.close()
+    os.remove(path)
+    return {
+        "cards": size,
+        "build_seconds": round(build_seconds, 2),
+        "card_list": card_list,
+        "price_chart": percentiles(timings) if timings else None,
+    }
+
+
+def git_version():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=HERE, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def flatten(results, prefix=""):
+    # {"import": {"1000": {"rows_per_s": ...}}} -> {"import.1000.rows_per_s": ...}
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"📊 {old.get('version')} -> {new.get('version')}")
+    before, after = flatten(old["results"]), flatten(new["results"])
+    for key in sorted(before.keys() & after.keys()):
+        if key.endswith(("_ms", "_per_s", "seconds", "requests", "throttled")) and before[key]:
+            ratio = after[key] / before[key]
+            # Latencies and durations should go down, throughput up
+            worse = ratio > 1.1 if not key.endswith("_per_s") else ratio < 0.9
+            print(f"{'⚠️ ' if worse else '   '}{key}: {before[key]} -> {after[key]} ({ratio:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importer, card list and price chart benchmarks")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma separated row counts, e.g. 1000,10000,100000,1000000")
+    parser.add_argument("--skip", default="", help="comma separated parts to skip: import, queries")
+    parser.add_argument("--distinct", type=float, default=0.25, help="distinct printings per CSV row")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake Scryfall seconds per response")
+    parser.add_argument("--rate-limit", type=int, default=None, help="fake Scryfall requests/s before 429s")
+    parser.add_argument("--client-rate", type=float, default=10, help="SCRYFALL_RATE for the importer")
+    parser.add_argument("--workers", type=int, default=1, help="IMPORT_WORKERS for the importer")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--days", type=int, default=30, help="days of price history in the synthetic db")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", help="JSON file to write (default bench-<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    skip = set(filter(None, args.skip.split(",")))
+    workdir = tempfile.mkdtemp(prefix="mtg-bench-")
+    results = {"import": {}, "queries": {}}
+
+    for size in sizes:
+        if "import" not in skip:
+            print(f"📥 Importing {size:,} CSV rows...", flush=True)
+            results["import"][str(size)] = run = bench_import(size, args, workdir)
+            print(f"   {run['rows_per_s']:,} rows/s, {run['requests']} requests, {run['throttled']} throttled")
+        if "queries" not in skip:
+            print(f"🔎 Querying {size:,} cards...", flush=True)
+            results["queries"][str(size)] = run = bench_queries(size, args, workdir)
+            overall = run["card_list"]["overall"]
+            print(f"   card list p50 {overall['p50_ms']} ms, p99 {overall['p99_ms']} ms; "
+                  f"price chart {run['price_chart']}")
+
+    output = args.output or f"bench-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, "w") as f:
+        json.dump({
+            "version": git_version(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+            "results": results,
+        }, f, indent=2)
+    print(f"✅ Results saved to {output}")
@@ -0,0 +1,131 @@
+import json
+from collections import defaultdict
+
+from catalog import ADOPT_LEGACY_SQL, UPSERT_CARD_SQL, card_colors, card_fields, changed_cards, fields_hash, write_card_colors
+from collection_ledger import RECORD_SQL
+from import_journal import now
+from instrument import span
+
+DEFAULT_CHUNK_SIZE = 1000
+
+UPSERT_SETS_SQL = """
+    INSERT INTO Sets (set_name, code, release_date) VALUES {values}
+    ON CONFLICT(code) DO UPDATE SET set_name = excluded.set_name
+    RETURNING code, set_id
+"""
+
+
+def card_record(card):
+    # Scryfall card -> (set code, Sets row, card fields, colors): everything
+    # the writer needs, as plain tuples that can come from a worker process
+    code = card['set'].lower()
+    return code, (card.get('set_name'), code, card.get('released_at')), card_fields(card), card_colors(card)
+
+
+class BulkWriter:
+    # Buffers import rows and writes them a chunk at a time: sets and cards are
+    # deduplicated in memory, every table gets one statement per chunk, and each
+    # chunk is its own transaction so a crash only loses the chunk in progress.
+    # Quantities are appended to the collection ledger, one entry per card and
+    # chunk, tagged with `source`.
+    def __init__(self, conn, chunk_size=DEFAULT_CHUNK_SIZE, on_commit=None, before_commit=None, source="import"):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.chunk_size = chunk_size
+        self.source = source
+        self.on_commit = on_commit
+        # Runs inside the chunk's transaction, e.g. to checkpoint the import
+        self.before_commit = before_commit
+        self.set_ids = dict(self.cursor.execute("SELECT code, set_id FROM Sets"))
+        self.has_legacy = self.cursor.execute(
+            "SELECT 1 FROM Cards WHERE scryfall_id IS NULL LIMIT 1"
+        ).fetchone() is not None
+
+        self.new_sets = {}                      # code -> Sets row
+        self.new_cards = {}                     # scryfall_id -> (code, card fields, colors)
+        self.card_quantities = defaultdict(int)  # scryfall_id -> quantity
+        self.quantities = defaultdict(int)       # card_id -> quantity
+        self.rows = 0
+        self.committed = 0
+
+    def add_card(self, card, quantity):
+        # A card resolved from Scryfall that may not be in Cards yet
+        self.add_record(card_record(card), quantity)
+
+    def add_record(self, record, quantity):
+        # Same as add_card, for a card already turned into a card_record()
+        code, set_row, fields, colors = record
+        if code not in self.set_ids:
+            self.new_sets.setdefault(code, set_row)
+        self.new_cards[fields[0]] = (code, fields, colors)
+        self.card_quantities[fields[0]] += quantity
+        self.row_done()
+
+    def add_card_id(self, card_id, quantity):
+        # A card that already exists in Cards
+        self.quantities[card_id] += quantity
+        self.row_done()
+
+    def skip(self):
+        # A row that produced nothing still counts towards the chunk position
+        self.row_done()
+
+    def row_done(self):
+        self.rows += 1
+        if self.rows >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        with span("import.write"):
+            self.write_chunk()
+        if self.on_commit:
+            self.on_commit(self.committed)
+
+    def write_chunk(self):
+        cursor = self.cursor
+
+        if self.new_sets:
+            rows = list(self.new_sets.values())
+            values = ", ".join(["(?, ?, ?)"] * len(rows))
+            cursor.execute(UPSERT_SETS_SQL.format(values=values), [v for row in rows for v in row])
+            self.set_ids.update(cursor.fetchall())
+            self.new_sets.clear()
+
+        if self.new_cards:
+            rows = []
+            for code, fields, colors in self.new_cards.values():
+                set_id = self.set_ids[code]
+                rows.append((set_id, fields_hash(fields, colors)) + fields)
+            if self.has_legacy:
+                cursor.executemany(ADOPT_LEGACY_SQL, [(r[2], r[-1], r[0], r[3]) for r in rows])
+            changed = changed_cards(cursor, {r[2]: r[1] for r in rows})
+            cursor.executemany(UPSERT_CARD_SQL, [r for r in rows if r[2] in changed])
+            write_card_colors(cursor, {sid: self.new_cards[sid][2] for sid in changed})
+
+            # executemany() drops RETURNING rows, and unchanged cards are not
+            # returned anyway, so map scryfall_id -> card_id with one query
+            card_ids = dict(cursor.execute(
+                "SELECT scryfall_id, card_id FROM Cards WHERE scryfall_id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(self.new_cards)),)
+            ))
+            for scryfall_id, quantity in self.card_quantities.items():
+                self.quantities[card_ids[scryfall_id]] += quantity
+            self.new_cards.clear()
+            self.card_quantities.clear()
+
+        if self.quantities:
+            stamp = now()
+            cursor.executemany(RECORD_SQL, [
+                (card_id, quantity, self.source, stamp) for card_id, quantity in self.quantities.items()
+            ])
+            self.quantities.clear()
+
+        if self.before_commit:
+            self.before_commit(self.committed + self.rows)
+        self.conn.commit()
+        self.committed += self.rows
+        self.rows = 0
+
+    def close(self):
+        if self.rows:
+            self.flush()
@@ -0,0 +1,255 @@
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+# Offline matching for messy intake lists (buylists, scanner apps): rows with
+# misspelled names, other sites' set codes or no collector number. The index
+# is built in memory from the local Cards/Sets tables:
+#   - normalized name -> printings (exact hits are one dict lookup)
+#   - word -> names, and trigram -> words for misspellings: a misspelt word
+#     is swapped for the closest known words, names holding every word are
+#     the candidates, scored by trigram overlap (Dice coefficient)
+#   - set aliases -> set code: codes, set names, SET_ALIASES and the
+#     SetAliases table
+# No network calls; every match carries a confidence and the alternatives it
+# was chosen from, so doubtful rows can be reviewed in bulk.
+
+SET_ALIASES_SQL = """
+CREATE TABLE IF NOT EXISTS SetAliases (
+    alias TEXT PRIMARY KEY,
+    code TEXT NOT NULL
+)
+"""
+
+# Codes other sites and apps use where Scryfall's differ. More can be added
+# per database with Match_intake.py --alias.
+SET_ALIASES = {
+    "dar": "dom",       # Dominaria on MTGO/Arena
+    "core21": "m21",
+    "core20": "m20",
+    "core19": "m19",
+    "m2021": "m21",
+    "m2020": "m20",
+    "m2019": "m19",
+    "alpha": "lea",
+    "beta": "leb",
+    "unlimited": "2ed",
+}
+
+# Known words tried in place of a misspelt one
+SIMILAR_WORDS = 3
+# Names whose shared-word count is highest get an exact similarity score
+# when no name has every word of the query
+CANDIDATES = 20
+# Names less similar than this to every known name are left unmatched
+MIN_SIMILARITY = 0.4
+# Two names closer than this are reported as an ambiguous match
+AMBIGUITY_MARGIN = 0.05
+# Confidence is multiplied by this when the row's set is unknown or not one
+# the matched card was printed in
+SET_MISMATCH = 0.9
+# ... and by this when the set has the card but not at the row's collector
+# number, which leaves it below the importer's MIN_CONFIDENCE for review
+NUMBER_MISMATCH = 0.75
+
+
+NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_name(name):
+    # Lowercase ASCII words: "Æther Vial" / "aether  vial," -> "aether vial"
+    if not name.isascii():
+        name = name.replace("Æ", "Ae").replace("æ", "ae")
+        name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return " ".join(NON_WORD.sub(" ", name.lower()).split())
+
+
+def normalize_set(code):
+    # "(M21)", " m21 " -> "m21"; set names are normalized like card names
+    return normalize_name(code.strip().strip("()[]"))
+
+
+def trigrams(name):
+    padded = f"  {name} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(grams, other):
+    # Dice coefficient of two trigram sets, 0.0 to 1.0
+    return 2 * len(grams & other) / (len(grams) + len(other))
+
+
+def collector_sort_key(number):
+    # "7" < "12" < "12a" < "★1"
+    digits = re.match(r"\d+", number or "")
+    return (0, int(digits.group()), number) if digits else (1, 0, number or "")
+
+
+class Match:
+    # status: "exact" (name, or set and number, match exactly), "fuzzy"
+    # (name matched by similarity), "ambiguous" (several candidates fit
+    # equally well; card_id is the first of them) or "unmatched"
+    def __init__(self, status, card_id=None, confidence=0.0, candidates=()):
+        self.status = status
+        self.card_id = card_id
+        self.confidence = confidence
+        # [(card_id, card name, set code, collector number)] that fit the row
+        self.candidates = list(candidates)
+
+    def accepted(self, min_confidence):
+        # Safe to import without review
+        return self.status in ("exact", "fuzzy") and self.confidence >= min_confidence
+
+    def __repr__(self):
+        return f"Match({self.status}, card_id={self.card_id}, confidence={self.confidence:.2f})"
+
+
+class CardMatcher:
+    def __init__(self, conn):
+        # printings: card_id -> (card name, set code, collector number)
+        self.printings = {}
+        # normalized name -> [card_id], newest set first, then by collector number
+        self.by_name = defaultdict(list)
+        # (set code, collector number) -> card_id
+        self.by_number = {}
+        rows = conn.execute("""
+            SELECT Cards.card_id, Cards.card_name, Sets.code, Cards.collector_number, Sets.release_date
+            FROM Cards JOIN Sets ON Cards.set_id = Sets.set_id
+            WHERE Cards.card_name IS NOT NULL
+        """).fetchall()
+        # Both sorts are stable: newest set first, then by collector number
+        rows.sort(key=lambda row: collector_sort_key(row[3]))
+        rows.sort(key=lambda row: (row[4] or "", row[2]), reverse=True)
+        for card_id, name, code, number, _ in rows:
+            self.printings[card_id] = (name, code, number)
+            self.by_number[(code, number)] = card_id
+            normalized = normalize_name(name)
+            self.by_name[normalized].append(card_id)
+            # Double-faced and split cards are often listed by their front face
+            if " // " in name:
+                self.by_name[normalize_name(name.split(" // ")[0])].append(card_id)
+
+        self.names = list(self.by_name)
+        self.name_grams = [trigrams(name) for name in self.names]
+        # word -> indexes of the names containing it, and trigram -> words
+        self.word_names = defaultdict(set)
+        for i, name in enumerate(self.names):
+            for word in name.split():
+                self.word_names[word].add(i)
+        self.word_grams = {word: trigrams(word) for word in self.word_names}
+        self.gram_words = defaultdict(list)
+        for word, grams in self.word_grams.items():
+            for gram in grams:
+                self.gram_words[gram].append(word)
+
+        self.set_aliases = {}
+        for code, set_name in conn.execute("SELECT code, set_name FROM Sets"):
+            if set_name:
+                self.set_aliases.setdefault(normalize_set(set_name), code)
+        codes = set(self.set_aliases.values()) | {code for _, code, _ in self.printings.values()}
+        self.set_aliases.update({code: code for code in codes})
+        self.set_aliases.update({alias: code for alias, code in SET_ALIASES.items() if code in codes})
+        self.set_aliases.update({normalize_set(alias): code for alias, code in conn.execute(
+            "SELECT alias, code FROM SetAliases"
+        )})
+
+    def set_code(self, text):
+        # Scryfall set code for a code, alias or set name; None when unknown
+        return self.set_aliases.get(normalize_set(text or ""))
+
+    def similar_words(self, word):
+        # Names containing the word or, when it is not a known word, one of
+        # the known words closest to it by trigrams
+        if word in self.word_names:
+            return self.word_names[word]
+        grams = trigrams(word)
+        counts = Counter()
+        for gram in grams:
+            counts.update(self.gram_words.get(gram, ()))
+        close = sorted(
+            ((similarity(grams, self.word_grams[other]), other) for other, _ in counts.most_common(CANDIDATES)),
+            reverse=True,
+        )[:SIMILAR_WORDS]
+        names = set()
+        for score, other in close:
+            if score >= MIN_SIMILARITY:
+                names |= self.word_names[other]
+        return names
+
+    def similar_names(self, normalized, limit=5):
+        # [(score, name)] best first. Candidates are the names holding every
+        # word of the query (misspelt words replaced by their closest known
+        # words), or failing that the names sharing the most words.
+        # Words that resemble no known word (badly garbled, or noise such as
+        # "foil") are left out rather than ruling out every name
+        per_word = [names for names in map(self.similar_words, normalized.split()) if names]
+        candidates = set.intersection(*per_word) if per_word else set()
+        if not candidates:
+            counts = Counter()
+            for names in per_word:
+                counts.update(names)
+            candidates = [i for i, _ in counts.most_common(CANDIDATES)]
+        grams = trigrams(normalized)
+        scored = sorted(((similarity(grams, self.name_grams[i]), self.names[i]) for i in candidates), reverse=True)
+        return scored[:limit]
+
+    def describe(self, card_ids):
+        return [(card_id,) + self.printings[card_id] for card_id in card_ids]
+
+    def match(self, name, set_code=None, collector_number=None):
+        code = self.set_code(set_code) if set_code else None
+        number = (collector_number or "").strip().lstrip("#") or None
+        normalized = normalize_name(name or "")
+
+        # Set and collector number identify the printing outright; the name
+        # only has to agree with it
+        card_id = self.by_number.get((code, number)) if code and number else None
+        if card_id is not None:
+            printed = normalize_name(self.printings[card_id][0])
+            if not normalized or normalized == printed or card_id in self.by_name.get(normalized, ()):
+                return Match("exact", card_id, 1.0, self.describe([card_id]))
+            score = similarity(trigrams(normalized), trigrams(printed))
+            if score >= 0.5:
+                return Match("fuzzy", card_id, score, self.describe([card_id]))
+
+        if not normalized:
+            return Match("unmatched")
+        if normalized in self.by_name:
+            scored = [(1.0, normalized)]
+        else:
+            scored = self.similar_names(normalized)
+            if not scored or scored[0][0] < MIN_SIMILARITY:
+                return Match("unmatched", candidates=[
+                    row for _, other in scored[:3] for row in self.describe(self.by_name[other][:1])
+                ])
+        score, best = scored[0]
+        # Names scoring almost as well as the best one make the row ambiguous
+        rivals = [other for other_score, other in scored[1:] if other_score >= score - AMBIGUITY_MARGIN]
+        printings = list(self.by_name[best])
+
+        # Narrow the printings by set, then by collector number
+        in_set = [card_id for card_id in printings if self.printings[card_id][1] == code]
+        if in_set:
+            printings = in_set
+            numbered = [card_id for card_id in printings if self.printings[card_id][2] == number]
+            if numbered:
+                printings = numbered
+            elif number:
+                score *= NUMBER_MISMATCH
+        elif set_code:
+            score *= SET_MISMATCH
+
+        status = "exact" if score == 1.0 else "fuzzy"
+        if rivals or len(printings) > 1:
+            status = "ambiguous"
+            for other in rivals:
+                printings += self.by_name[other]
+        return Match(status, printings[0], score, self.describe(printings[:10]))
+
+    def match_rows(self, rows):
+        # rows: (name, set code, collector number) -> [Match], and counts per status
+        matches = [self.match(*row) for row in rows]
+        counts = defaultdict(int)
+        for match in matches:
+            counts[match.status] += 1
+        return matches, dict(counts)
@@ -0,0 +1,282 @@
+import gzip
+import hashlib
+import json
+
+# Local card catalog: every printing from a Scryfall bulk dump lives in the
+# Sets/Cards tables so imports and the GUI can resolve cards without the API.
+
+SETS_SQL = """
+CREATE TABLE IF NOT EXISTS Sets (
+    set_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    set_name TEXT,
+    code TEXT UNIQUE,
+    release_date TEXT
+)
+"""
+
+# One row per printing. scryfall_id is the stable key; collector_number lets
+# (set code, collector number) lookups resolve locally; data_hash lets a
+# refresh skip rows whose card data has not changed.
+CARDS_SQL = """
+CREATE TABLE IF NOT EXISTS Cards (
+    card_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    card_name TEXT,
+    mana_cost TEXT,
+    cmc REAL,
+    power TEXT,
+    toughness TEXT,
+    loyalty TEXT,
+    rarity TEXT,
+    set_id INTEGER,
+    type_line TEXT,
+    oracle_text TEXT,
+    flavor_text TEXT,
+    artist TEXT,
+    image_url TEXT,
+    collector_number TEXT,
+    scryfall_id TEXT UNIQUE,
+    data_hash TEXT,
+    FOREIGN KEY (set_id) REFERENCES Sets(set_id)
+)
+"""
+
+LEGACY_CARD_COLUMNS = (
+    "card_id", "card_name", "mana_cost", "cmc", "power", "toughness", "loyalty",
+    "rarity", "set_id", "type_line", "oracle_text", "flavor_text", "artist", "image_url",
+)
+
+# Columns filled from a Scryfall card object, in card_fields() order
+CARD_COLUMNS = (
+    "scryfall_id", "card_name", "mana_cost", "cmc", "power", "toughness", "loyalty",
+    "rarity", "type_line", "oracle_text", "flavor_text", "artist", "image_url",
+    "collector_number",
+)
+
+UPSERT_CARD_SQL = f"""
+    INSERT INTO Cards (set_id, data_hash, {", ".join(CARD_COLUMNS)})
+    VALUES ({", ".join("?" * (len(CARD_COLUMNS) + 2))})
+    ON CONFLICT(scryfall_id) DO UPDATE SET
+        set_id = excluded.set_id,
+        data_hash = excluded.data_hash,
+        {", ".join(f"{c} = excluded.{c}" for c in CARD_COLUMNS[1:])}
+    WHERE Cards.data_hash IS NOT excluded.data_hash
+"""
+
+# Rows written before the catalog existed have no scryfall_id; claim them so
+# Collection keeps pointing at the same card_id
+ADOPT_LEGACY_SQL = """
+    UPDATE Cards SET scryfall_id = ?, collector_number = ?
+    WHERE scryfall_id IS NULL AND set_id = ? AND card_name = ?
+"""
+
+# Scryfall color letters -> CardColors.color_name (seeded by migrations)
+COLOR_NAMES = {"W": "White", "U": "Blue", "B": "Black", "R": "Red", "G": "Green"}
+
+CLEAR_COLORS_SQL = """
+    DELETE FROM Card_CardColors WHERE card_id IN (
+        SELECT card_id FROM Cards WHERE scryfall_id IN (SELECT value FROM json_each(?))
+    )
+"""
+
+ADD_COLOR_SQL = """
+    INSERT OR IGNORE INTO Card_CardColors (card_id, color_id)
+    SELECT Cards.card_id, CardColors.color_id FROM Cards, CardColors
+    WHERE Cards.scryfall_id = ? AND CardColors.color_name = ?
+"""
+
+BATCH_SIZE = 5000
+
+
+def ensure_catalog_schema(conn):
+    conn.execute(SETS_SQL)
+    conn.execute(CARDS_SQL)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(Cards)")}
+    if "scryfall_id" not in columns:
+        # Older Cards tables carry UNIQUE(card_name, set_id) or a rarity CHECK
+        # that reject alternate printings, so rebuild instead of ALTER TABLE
+        copied = ", ".join(c for c in LEGACY_CARD_COLUMNS if c in columns)
+        conn.execute("DROP TABLE IF EXISTS Cards_new")
+        conn.execute(CARDS_SQL.replace("Cards (", "Cards_new (", 1))
+        conn.execute(f"INSERT INTO Cards_new ({copied}) SELECT {copied} FROM Cards")
+        conn.execute("DROP TABLE Cards")
+        conn.execute("ALTER TABLE Cards_new RENAME TO Cards")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_set_number ON Cards(set_id, collector_number)")
+    conn.commit()
+
+
+def card_fields(card):
+    # Extract the Cards columns (CARD_COLUMNS order) from a Scryfall card object
+    image_uris = card.get('image_uris')
+    if not image_uris and card.get('card_faces'):
+        image_uris = card['card_faces'][0].get('image_uris')
+    return (
+        card.get('id'),
+        card.get('name'),
+        card.get('mana_cost'),
+        card.get('cmc'),
+        card.get('power'),
+        card.get('toughness'),
+        card.get('loyalty'),
+        card.get('rarity').capitalize() if card.get('rarity') else None,
+        card.get('type_line'),
+        card.get('oracle_text'),
+        card.get('flavor_text'),
+        card.get('artist'),
+        image_uris.get('normal') if image_uris else None,
+        card.get('collector_number'),
+    )
+
+
+def card_colors(card):
+    # Color letters of a card; double-faced cards keep them on their faces
+    colors = card.get('colors')
+    if colors is None and card.get('card_faces'):
+        colors = {c for face in card['card_faces'] for c in face.get('colors', [])}
+    return sorted(c for c in colors or () if c in COLOR_NAMES)
+
+
+def write_card_colors(cursor, colors):
+    # colors: {scryfall_id: color letters}; replaces those cards' Card_CardColors rows
+    if not colors:
+        return
+    cursor.execute(CLEAR_COLORS_SQL, (json.dumps(list(colors)),))
+    cursor.executemany(ADD_COLOR_SQL, [
+        (scryfall_id, COLOR_NAMES[c]) for scryfall_id, letters in colors.items() for c in letters
+    ])
+
+
+def fields_hash(fields, colors):
+    # Colors count as card data, so a color change (or a row loaded before
+    # colors were stored) gets its Card_CardColors rows rewritten
+    return hashlib.blake2b(repr((fields, tuple(colors))).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def changed_cards(cursor, hashes):
+    # scryfall_ids of {scryfall_id: data_hash} that are new or whose stored
+    # hash differs, i.e. the cards an upsert will actually write
+    stored = dict(cursor.execute(
+        "SELECT scryfall_id, data_hash FROM Cards WHERE scryfall_id IN (SELECT value FROM json_each(?))",
+        (json.dumps(list(hashes)),)
+    ))
+    return {scryfall_id for scryfall_id, data_hash in hashes.items() if stored.get(scryfall_id) != data_hash}
+
+
+def get_set_id(cursor, card, set_ids=None):
+    # Look up (or create) the Sets row for a card; set_ids caches code -> set_id
+    code = card['set'].lower()
+    if set_ids is not None and code in set_ids:
+        return set_ids[code]
+    cursor.execute("SELECT set_id FROM Sets WHERE code = ?", (code,))
+    row = cursor.fetchone()
+    if row:
+        set_id = row[0]
+    else:
+        cursor.execute(
+            "INSERT INTO Sets (set_name, code, release_date) VALUES (?, ?, ?)",
+            (card.get('set_name'), code, card.get('released_at'))
+        )
+        set_id = cursor.lastrowid
+    if set_ids is not None:
+        set_ids[code] = set_id
+    return set_id
+
+
+def upsert_card(cursor, card):
+    # Write one Scryfall card into Sets/Cards and return its card_id
+    set_id = get_set_id(cursor, card)
+    fields = card_fields(card)
+    colors = card_colors(card)
+    cursor.execute(ADOPT_LEGACY_SQL, (fields[0], fields[-1], set_id, fields[1]))
+    cursor.execute(UPSERT_CARD_SQL, (set_id, fields_hash(fields, colors)) + fields)
+    if cursor.rowcount:
+        write_card_colors(cursor, {fields[0]: colors})
+    cursor.execute("SELECT card_id FROM Cards WHERE scryfall_id = ?", (fields[0],))
+    return cursor.fetchone()[0]
+
+
+def find_card_id(cursor, set_code, collector_number):
+    # Resolve a printing from the local catalog; None when it is not there
+    cursor.execute("""
+        SELECT Cards.card_id FROM Cards
+        JOIN Sets ON Cards.set_id = Sets.set_id
+        WHERE Sets.code = ? AND Cards.collector_number = ?
+    """, (set_code.lower(), collector_number))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def iter_json_array(path, chunk_size=1 << 20):
+    # Stream the objects of a top-level JSON array without loading the whole
+    # file; memory stays around chunk_size plus the largest single object
+    decoder = json.JSONDecoder()
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} is not a JSON array")
+        pos = 1
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                more = f.read(chunk_size)
+                if not more:
+                    raise
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+            yield obj
+            pos = end
+
+
+def load_bulk(conn, path, batch_size=BATCH_SIZE, progress=None):
+    # Bulk-load a Scryfall bulk dump (default_cards / all_cards) into Sets and
+    # Cards. Re-running it with a newer dump only rewrites rows whose card
+    # data changed. Returns (cards_seen, rows_written). Expects a migrated
+    # connection (migrations.connect).
+    cursor = conn.cursor()
+    set_ids = dict(cursor.execute("SELECT code, set_id FROM Sets"))
+    legacy = {
+        (set_id, name): card_id
+        for card_id, set_id, name in cursor.execute(
+            "SELECT card_id, set_id, card_name FROM Cards WHERE scryfall_id IS NULL"
+        )
+    }
+
+    seen = 0
+    before = conn.total_changes
+    batch, adopt, colors = [], [], {}
+
+    def flush():
+        if adopt:
+            cursor.executemany(ADOPT_LEGACY_SQL, adopt)
+            adopt.clear()
+        # Only new and changed cards are written, colors included
+        changed = changed_cards(cursor, {row[2]: row[1] for row in batch})
+        cursor.executemany(UPSERT_CARD_SQL, [row for row in batch if row[2] in changed])
+        write_card_colors(cursor, {scryfall_id: colors[scryfall_id] for scryfall_id in changed})
+        conn.commit()
+        batch.clear()
+        colors.clear()
+        if progress:
+            progress(seen)
+
+    for card in iter_json_array(path):
+        if card.get('object') != 'card' or not card.get('set'):
+            continue
+        seen += 1
+        set_id = get_set_id(cursor, card, set_ids)
+        fields = card_fields(card)
+        if legacy and legacy.pop((set_id, fields[1]), None) is not None:
+            adopt.append((fields[0], fields[-1], set_id, fields[1]))
+        colors[fields[0]] = card_colors(card)
+        batch.append((set_id, fields_hash(fields, colors[fields[0]])) + fields)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    return seen, conn.total_changes - before
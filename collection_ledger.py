@@ -0,0 +1,189 @@
+from import_journal import now
+
+# Append-only history of the collection. Every change is a CollectionLedger
+# row (card_id, delta, source, recorded_at) and never rewritten; Collection is
+# the materialized current state of the ledger:
+#   - the ledger_apply trigger adds each new entry's delta to Collection in
+#     the same transaction, so GUI writes stay a single indexed append
+#   - compaction folds the entries since the last snapshot into a new
+#     CollectionSnapshots/SnapshotQuantities snapshot (owned quantities as of
+#     one entry_id) and repairs any Collection row that drifted from it
+#   - "what did we own on date X" is the latest snapshot before X plus the
+#     few entries between them, not a replay of the whole ledger
+# Collection rows written before the ledger existed (or while its trigger was
+# missing) are taken in as "opening balance" entries.
+
+LEDGER_TABLES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS CollectionLedger (
+        entry_id INTEGER PRIMARY KEY,
+        card_id INTEGER NOT NULL,
+        delta INTEGER NOT NULL,
+        source TEXT NOT NULL,
+        recorded_at TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_ledger_recorded ON CollectionLedger(recorded_at)",
+    "CREATE INDEX IF NOT EXISTS idx_ledger_card ON CollectionLedger(card_id, entry_id)",
+    """
+    CREATE TABLE IF NOT EXISTS CollectionSnapshots (
+        snapshot_id INTEGER PRIMARY KEY,
+        entry_id INTEGER UNIQUE NOT NULL,
+        taken_at TEXT NOT NULL,
+        cards INTEGER NOT NULL,
+        copies INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS SnapshotQuantities (
+        snapshot_id INTEGER,
+        card_id INTEGER,
+        quantity INTEGER NOT NULL,
+        PRIMARY KEY (snapshot_id, card_id)
+    ) WITHOUT ROWID
+    """,
+]
+
+APPLY_TRIGGER_SQL = """
+CREATE TRIGGER IF NOT EXISTS ledger_apply AFTER INSERT ON CollectionLedger BEGIN
+    INSERT INTO Collection (card_id, quantity) VALUES (new.card_id, new.delta)
+    ON CONFLICT(card_id) DO UPDATE SET quantity = quantity + excluded.quantity;
+END
+"""
+
+# (card_id, delta, source, recorded_at)
+RECORD_SQL = "INSERT INTO CollectionLedger (card_id, delta, source, recorded_at) VALUES (?, ?, ?, ?)"
+
+# (source, recorded_at, card_id, new quantity, card_id); records nothing
+# when the quantity is unchanged
+SET_QUANTITY_SQL = """
+    INSERT INTO CollectionLedger (card_id, delta, source, recorded_at)
+    SELECT card_id, delta, ?, ? FROM (
+        SELECT ? AS card_id, ? - COALESCE((SELECT quantity FROM Collection WHERE card_id = ?), 0) AS delta
+    ) WHERE delta != 0
+"""
+
+# Entries between two snapshots are replayed on top of the older one, so
+# point-in-time queries read at most about this many ledger rows
+SNAPSHOT_EVERY = 10000
+
+# (base snapshot_id, base entry_id, target entry_id) -> (card_id, quantity)
+# rows with a non-zero quantity
+QUANTITIES_SQL = """
+    SELECT card_id, SUM(quantity) FROM (
+        SELECT card_id, quantity FROM SnapshotQuantities WHERE snapshot_id = ?
+        UNION ALL
+        SELECT card_id, delta FROM CollectionLedger WHERE entry_id > ? AND entry_id <= ?
+    ) GROUP BY card_id HAVING SUM(quantity) != 0
+"""
+
+
+def last_entry(conn):
+    return conn.execute("SELECT COALESCE(MAX(entry_id), 0) FROM CollectionLedger").fetchone()[0]
+
+
+def base_snapshot(conn, entry_id):
+    # (snapshot_id, entry_id) of the newest snapshot at or before entry_id;
+    # (None, 0) when there is none and the whole ledger must be replayed
+    row = conn.execute(
+        "SELECT snapshot_id, entry_id FROM CollectionSnapshots WHERE entry_id <= ? ORDER BY entry_id DESC LIMIT 1",
+        (entry_id,)
+    ).fetchone()
+    return row or (None, 0)
+
+
+def quantities_at_entry(conn, entry_id):
+    # {card_id: quantity} of every card owned once the ledger reached entry_id
+    snapshot_id, base = base_snapshot(conn, entry_id)
+    return dict(conn.execute(QUANTITIES_SQL, (snapshot_id, base, entry_id)))
+
+
+def quantities_at(conn, when):
+    # {card_id: quantity} as of a date ("2025-05-01", the end of that day) or
+    # an ISO timestamp
+    if len(when) == 10:
+        when += "T23:59:59"
+    # Entries are appended in time order, so the last one recorded by then
+    # is one step down idx_ledger_recorded
+    row = conn.execute(
+        "SELECT entry_id FROM CollectionLedger WHERE recorded_at <= ? ORDER BY recorded_at DESC, entry_id DESC LIMIT 1",
+        (when,)
+    ).fetchone()
+    return quantities_at_entry(conn, row[0]) if row else {}
+
+
+def card_history(conn, card_id, limit=50):
+    # [(recorded_at, delta, source)], newest first
+    return conn.execute(
+        "SELECT recorded_at, delta, source FROM CollectionLedger WHERE card_id = ? ORDER BY entry_id DESC LIMIT ?",
+        (card_id, limit)
+    ).fetchall()
+
+
+def snapshot(conn):
+    # Snapshot of the quantities at the newest entry; None when nothing
+    # changed since the last one
+    entry_id = last_entry(conn)
+    snapshot_id, base = base_snapshot(conn, entry_id)
+    if entry_id == base:
+        return None
+    quantities = conn.execute(QUANTITIES_SQL, (snapshot_id, base, entry_id)).fetchall()
+    cursor = conn.execute(
+        "INSERT INTO CollectionSnapshots (entry_id, taken_at, cards, copies) VALUES (?, ?, ?, ?)",
+        (entry_id, now(), len(quantities), sum(quantity for _, quantity in quantities))
+    )
+    conn.executemany(
+        f"INSERT INTO SnapshotQuantities (snapshot_id, card_id, quantity) VALUES ({cursor.lastrowid}, ?, ?)",
+        quantities
+    )
+    return cursor.lastrowid
+
+
+def compact(conn):
+    # Fold new entries into a snapshot and bring Collection back in line with
+    # it. Returns (snapshot_id or None, Collection rows repaired).
+    snapshot_id = snapshot(conn)
+    quantities = quantities_at_entry(conn, last_entry(conn))
+    drifted = [
+        (quantities.get(card_id, 0), card_id)
+        for card_id, quantity in conn.execute("SELECT card_id, quantity FROM Collection")
+        if quantity != quantities.get(card_id, 0)
+    ]
+    listed = {card_id for card_id, in conn.execute("SELECT card_id FROM Collection")}
+    missing = [(card_id, quantity) for card_id, quantity in quantities.items() if card_id not in listed]
+    conn.executemany("UPDATE Collection SET quantity = ? WHERE card_id = ?", drifted)
+    conn.executemany("INSERT INTO Collection (card_id, quantity) VALUES (?, ?)", missing)
+    conn.commit()
+    return snapshot_id, len(drifted) + len(missing)
+
+
+def compact_if_due(conn, every=SNAPSHOT_EVERY):
+    # Compact once `every` entries have piled up since the last snapshot
+    entry_id = last_entry(conn)
+    if entry_id - base_snapshot(conn, entry_id)[1] >= every:
+        return compact(conn)
+    return None
+
+
+def _open_balance(conn):
+    # Ledger entries for whatever Collection holds beyond the ledger's own
+    # total. Runs without ledger_apply, since Collection already has it.
+    totals = quantities_at_entry(conn, last_entry(conn))
+    stamp = now()
+    conn.executemany(RECORD_SQL, [
+        (card_id, (quantity or 0) - totals.get(card_id, 0), "opening balance", stamp)
+        for card_id, quantity in conn.execute("SELECT card_id, quantity FROM Collection")
+        if (quantity or 0) != totals.get(card_id, 0)
+    ])
+
+
+def ensure_collection_ledger(conn):
+    for sql in LEDGER_TABLES_SQL:
+        conn.execute(sql)
+    has_trigger = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'ledger_apply'"
+    ).fetchone() is not None
+    if not has_trigger:
+        _open_balance(conn)
+        conn.execute(APPLY_TRIGGER_SQL)
+    conn.commit()
@@ -0,0 +1,174 @@
+# Collection counts kept up to date by triggers, so filter lists and
+# dashboard numbers are small reads however large the collection gets:
+#   SetSummary        one row per set with owned cards: code, cards, copies
+#   RaritySummary     one row per rarity with owned cards ('' = no rarity)
+#   CollectionTotals  a single row: owned cards, copies and sets
+# A card counts as owned when its Collection quantity is above zero and it
+# exists in Cards. Triggers on Collection add or remove a card's share when
+# its quantity changes; triggers on Cards move it when its set or rarity
+# changes.
+
+SUMMARY_TABLES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS SetSummary (
+        set_id INTEGER PRIMARY KEY,
+        code TEXT,
+        cards INTEGER NOT NULL,
+        copies INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS RaritySummary (
+        rarity TEXT PRIMARY KEY,
+        cards INTEGER NOT NULL,
+        copies INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS CollectionTotals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        cards INTEGER NOT NULL,
+        copies INTEGER NOT NULL,
+        sets INTEGER NOT NULL
+    )
+    """,
+]
+
+
+def _add(set_id, rarity, quantity):
+    # Statements adding one owned card to the summaries
+    return f"""
+        INSERT INTO SetSummary (set_id, code, cards, copies)
+        SELECT set_id, code, 1, {quantity} FROM Sets WHERE set_id = {set_id}
+        ON CONFLICT(set_id) DO UPDATE SET cards = cards + 1, copies = copies + excluded.copies;
+        INSERT INTO RaritySummary (rarity, cards, copies) VALUES (COALESCE({rarity}, ''), 1, {quantity})
+        ON CONFLICT(rarity) DO UPDATE SET cards = cards + 1, copies = copies + excluded.copies;
+        UPDATE CollectionTotals SET cards = cards + 1, copies = copies + {quantity};
+    """
+
+
+def _remove(set_id, rarity, quantity):
+    # Statements taking one owned card out again; emptied rows are dropped
+    return f"""
+        UPDATE SetSummary SET cards = cards - 1, copies = copies - {quantity} WHERE set_id = {set_id};
+        DELETE FROM SetSummary WHERE set_id = {set_id} AND cards = 0;
+        UPDATE RaritySummary SET cards = cards - 1, copies = copies - {quantity}
+        WHERE rarity = COALESCE({rarity}, '');
+        DELETE FROM RaritySummary WHERE rarity = COALESCE({rarity}, '') AND cards = 0;
+        UPDATE CollectionTotals SET cards = cards - 1, copies = copies - {quantity};
+    """
+
+
+def _card(column, row):
+    return f"(SELECT {column} FROM Cards WHERE card_id = {row}.card_id)"
+
+
+def _owned(row):
+    return f"{row}.quantity > 0 AND EXISTS (SELECT 1 FROM Cards WHERE card_id = {row}.card_id)"
+
+
+def _collected(row):
+    return f"(SELECT quantity FROM Collection WHERE card_id = {row}.card_id)"
+
+
+# The Collection update triggers fire once for the old row and once for the
+# new one; upserts that raise a quantity run both
+TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS summary_collection_insert AFTER INSERT ON Collection
+    WHEN {_owned("new")} BEGIN
+        {_add(_card("set_id", "new"), _card("rarity", "new"), "new.quantity")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS summary_collection_delete AFTER DELETE ON Collection
+    WHEN {_owned("old")} BEGIN
+        {_remove(_card("set_id", "old"), _card("rarity", "old"), "old.quantity")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS summary_collection_update_old AFTER UPDATE OF card_id, quantity ON Collection
+    WHEN {_owned("old")} BEGIN
+        {_remove(_card("set_id", "old"), _card("rarity", "old"), "old.quantity")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS summary_collection_update_new AFTER UPDATE OF card_id, quantity ON Collection
+    WHEN {_owned("new")} BEGIN
+        {_add(_card("set_id", "new"), _card("rarity", "new"), "new.quantity")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS summary_cards_insert AFTER INSERT ON Cards
+    WHEN {_collected("new")} > 0 BEGIN
+        {_add("new.set_id", "new.rarity", _collected("new"))}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS summary_cards_delete AFTER DELETE ON Cards
+    WHEN {_collected("old")} > 0 BEGIN
+        {_remove("old.set_id", "old.rarity", _collected("old"))}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS summary_cards_update AFTER UPDATE OF set_id, rarity ON Cards
+    WHEN (old.set_id IS NOT new.set_id OR old.rarity IS NOT new.rarity) AND {_collected("new")} > 0 BEGIN
+        {_remove("old.set_id", "old.rarity", _collected("old"))}
+        {_add("new.set_id", "new.rarity", _collected("new"))}
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS summary_sets_insert AFTER INSERT ON SetSummary BEGIN
+        UPDATE CollectionTotals SET sets = sets + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS summary_sets_delete AFTER DELETE ON SetSummary BEGIN
+        UPDATE CollectionTotals SET sets = sets - 1;
+    END
+    """,
+]
+
+
+def rebuild_summary(conn):
+    # Recount everything from Collection and Cards
+    conn.execute("DELETE FROM SetSummary")
+    conn.execute("DELETE FROM RaritySummary")
+    conn.execute("INSERT OR REPLACE INTO CollectionTotals VALUES (1, 0, 0, 0)")
+    conn.execute("""
+        INSERT INTO SetSummary (set_id, code, cards, copies)
+        SELECT Sets.set_id, Sets.code, COUNT(*), SUM(Collection.quantity)
+        FROM Collection
+        JOIN Cards ON Cards.card_id = Collection.card_id
+        JOIN Sets ON Sets.set_id = Cards.set_id
+        WHERE Collection.quantity > 0
+        GROUP BY Sets.set_id
+    """)
+    conn.execute("""
+        INSERT INTO RaritySummary (rarity, cards, copies)
+        SELECT COALESCE(Cards.rarity, ''), COUNT(*), SUM(Collection.quantity)
+        FROM Collection JOIN Cards ON Cards.card_id = Collection.card_id
+        WHERE Collection.quantity > 0
+        GROUP BY COALESCE(Cards.rarity, '')
+    """)
+    conn.execute("""
+        UPDATE CollectionTotals SET
+            cards = (SELECT COALESCE(SUM(cards), 0) FROM RaritySummary),
+            copies = (SELECT COALESCE(SUM(copies), 0) FROM RaritySummary),
+            sets = (SELECT COUNT(*) FROM SetSummary)
+    """)
+
+
+def ensure_collection_summary(conn):
+    for sql in SUMMARY_TABLES_SQL:
+        conn.execute(sql)
+    # Rebuilding Cards drops its triggers, and changes made while they were
+    # missing were never counted, so recount whenever any is absent
+    has_triggers = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'summary_%'"
+    ).fetchone()[0] == len(TRIGGERS_SQL)
+    if not has_triggers:
+        for sql in TRIGGERS_SQL:
+            conn.execute(sql)
+        rebuild_summary(conn)
+    conn.commit()
@@ -0,0 +1,93 @@
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from http_cache import TTL_PRICE, default_cache
+from image_store import default_store
+from instrument import span
+from scryfall import API_BASE
+
+# Background loading for the GUI detail pane. Downloads and decoding run on a
+# small thread pool; results are handed back to the Tk main thread through a
+# queue polled with root.after, because Tk widgets may only be touched there.
+
+POLL_MS = 25
+MEMORY_IMAGES = 64
+
+
+def price_url(card_name, set_code):
+    # Encoded, so names with "&", "#", "+" or " // " (split cards) survive
+    return f"{API_BASE}/cards/named?{urlencode({'exact': card_name, 'set': set_code})}"
+
+
+def load_price(card_name, set_code):
+    with span("price.fetch"):
+        data = default_cache().get(price_url(card_name, set_code), TTL_PRICE).json()
+    return data.get("prices", {}).get("usd")
+
+
+class DetailLoader:
+    def __init__(self, root, workers=4):
+        self.root = root
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="detail")
+        self.done = queue.Queue()
+        self.generation = 0
+        self.futures = []
+        # Decoded thumbnails so revisiting a row skips the image store entirely
+        self.images = OrderedDict()
+        self.images_lock = threading.Lock()
+        root.after(POLL_MS, self._poll)
+
+    def load_image(self, card_id, url):
+        with self.images_lock:
+            if card_id in self.images:
+                self.images.move_to_end(card_id)
+                return self.images[card_id]
+        with span("image.load"):
+            image = default_store().fetch(card_id, url)
+            image.load()
+        with self.images_lock:
+            self.images[card_id] = image
+            while len(self.images) > MEMORY_IMAGES:
+                self.images.popitem(last=False)
+        return image
+
+    def select(self):
+        # A new selection makes everything in flight stale: cancel work that
+        # has not started and drop results that arrive late
+        self.generation += 1
+        for future in self.futures:
+            future.cancel()
+        self.futures = []
+
+    def submit(self, fn, args, on_done, on_error=None):
+        # Run fn(*args) off-thread and call on_done(result) on the Tk thread,
+        # unless the selection changed in the meantime
+        generation = self.generation
+
+        def run():
+            try:
+                self.done.put((generation, on_done, fn(*args)))
+            except Exception as e:
+                self.done.put((generation, on_error, e))
+
+        self.futures.append(self.pool.submit(run))
+
+    def prefetch(self, fn, *args):
+        # Warm the caches; failures are ignored until the row is actually selected
+        self.futures.append(self.pool.submit(fn, *args))
+
+    def _poll(self):
+        while True:
+            try:
+                generation, callback, value = self.done.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self.generation and callback:
+                callback(value)
+        self.root.after(POLL_MS, self._poll)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,193 @@
+import argparse
+import json
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs
+
+# Local stand-in for the Scryfall API, used to exercise the importer without
+# hitting the real service. Point the importer at it with:
+#   SCRYFALL_API=http://127.0.0.1:8765 python Import_csv_current
+
+RARITIES = ["common", "uncommon", "rare", "mythic"]
+
+
+# Size of Scryfall's 'normal' images
+IMAGE_SIZE = (488, 680)
+
+
+@lru_cache(maxsize=None)
+def fake_image(seed):
+    from PIL import Image
+    out = BytesIO()
+    Image.new("RGB", IMAGE_SIZE, ((seed * 37) % 256, (seed * 91) % 256, (seed * 53) % 256)).save(out, "JPEG")
+    return out.getvalue()
+
+
+def fake_card(set_code, collector_number, base="https://example.invalid"):
+    # Deterministic card JSON shaped like Scryfall's card object; image URLs
+    # point at `base`, which the server sets to itself
+    seed = sum(map(ord, f"{set_code}{collector_number}"))
+    return {
+        "object": "card",
+        "id": f"{set_code}-{collector_number}",
+        "name": f"Card {set_code.upper()} {collector_number}",
+        "mana_cost": "{" + str(seed % 6) + "}{G}",
+        "colors": ["G"] if seed % 3 else ["B", "G"],
+        "cmc": float(seed % 6 + 1),
+        "power": str(seed % 5),
+        "toughness": str(seed % 7),
+        "rarity": RARITIES[seed % 4],
+        "type_line": "Creature — Elf Warrior",
+        "oracle_text": "Flying",
+        "flavor_text": None,
+        "artist": "Stand-in Artist",
+        "set": set_code,
+        "set_name": f"Set {set_code.upper()}",
+        "collector_number": collector_number,
+        "released_at": "2020-01-01",
+        "image_uris": {"normal": f"{base}/images/{set_code}/{collector_number}.jpg"},
+        "prices": {"usd": f"{seed % 100 / 4:.2f}"},
+    }
+
+
+class ThrottledServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, rate_limit=None, missing=""):
+        super().__init__(address, ScryfallHandler)
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.missing = missing
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.requests = 0
+        self.throttled = 0
+
+    def over_limit(self):
+        # Fixed one-second window; anything past `rate_limit` gets a 429
+        with self.lock:
+            self.requests += 1
+            now = time.monotonic()
+            if now - self.window_start >= 1:
+                self.window_start = now
+                self.window_count = 0
+            self.window_count += 1
+            if self.rate_limit and self.window_count > self.rate_limit:
+                self.throttled += 1
+                return True
+            return False
+
+
+class ScryfallHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def lookup(self, set_code, collector_number):
+        if self.server.missing and collector_number.endswith(self.server.missing):
+            return None
+        host, port = self.server.server_address[:2]
+        return fake_card(set_code, collector_number, f"http://{host}:{port}")
+
+    def send_image(self, set_code, collector_number):
+        # Like Scryfall's image CDN: no rate limit, no API latency
+        body = fake_image(sum(map(ord, f"{set_code}{collector_number}")) % 64)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        parts = path.strip("/").split("/")
+        if len(parts) == 3 and parts[0] == "images":
+            self.send_image(parts[1], parts[2].rsplit(".", 1)[0])
+            return
+
+        if self.server.over_limit():
+            self.send_json(429, {"object": "error", "status": 429}, {"Retry-After": "1"})
+            return
+        time.sleep(self.server.latency)
+
+        if parts == ["cards", "named"]:
+            # Names produced by fake_card() end with the collector number
+            params = parse_qs(query)
+            name = params.get("exact", [""])[0]
+            set_code = params.get("set", [""])[0].lower()
+            parts = ["cards", set_code, name.rsplit(" ", 1)[-1]]
+        if len(parts) == 3 and parts[0] == "cards":
+            card = self.lookup(parts[1], parts[2])
+            if card:
+                # Answer conditional requests the way Scryfall's CDN does
+                etag = f'"{card["id"]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_json(200, card, {"ETag": etag})
+                return
+        self.send_json(404, {"object": "error", "status": 404})
+
+    def do_POST(self):
+        if self.server.over_limit():
+            self.send_json(429, {"object": "error", "status": 429}, {"Retry-After": "1"})
+            return
+        time.sleep(self.server.latency)
+
+        if self.path.split("?")[0].rstrip("/") != "/cards/collection":
+            self.send_json(404, {"object": "error", "status": 404})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        identifiers = json.loads(self.rfile.read(length) or b"{}").get("identifiers", [])
+        if len(identifiers) > 75:
+            self.send_json(422, {"object": "error", "status": 422})
+            return
+
+        data, not_found = [], []
+        for identifier in identifiers:
+            card = self.lookup(identifier.get("set", ""), identifier.get("collector_number", ""))
+            if card:
+                data.append(card)
+            else:
+                not_found.append(identifier)
+        self.send_json(200, {"object": "list", "not_found": not_found, "data": data})
+
+
+def serve(port=8765, latency=0.0, rate_limit=None, missing=""):
+    server = ThrottledServer(("127.0.0.1", port), latency, rate_limit, missing)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Scryfall stand-in")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument("--rate-limit", type=int, default=None, help="requests/second before answering 429")
+    parser.add_argument("--missing", default="", help="collector numbers ending with this return 404")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.latency, args.rate_limit, args.missing)
+    print(f"🧪 Fake Scryfall listening on http://127.0.0.1:{args.port}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"📊 {server.requests} requests, {server.throttled} throttled")
@@ -0,0 +1,219 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Persistent HTTP response cache shared by the importer and the GUI. Entries
+# live in their own SQLite file so cache writes never contend with
+# mtg_cards.db. Expired entries are revalidated with ETag/Last-Modified, and
+# the least recently used entries are evicted once the size cap is reached.
+
+CACHE_PATH = os.environ.get("MTG_HTTP_CACHE", "http_cache.db")
+MAX_BYTES = int(float(os.environ.get("MTG_HTTP_CACHE_MB", 512)) * 1024 * 1024)
+
+DAY = 24 * 60 * 60
+TTL_CARD = 7 * DAY
+TTL_PRICE = DAY  # Scryfall updates prices once a day
+# Hits only queue their last_used update; the queue is written with the next
+# put, eviction pass or once it holds this many entries
+TOUCH_BATCH = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    status INTEGER,
+    content_type TEXT,
+    body BLOB,
+    etag TEXT,
+    last_modified TEXT,
+    expires_at REAL,
+    last_used REAL,
+    size INTEGER
+)
+"""
+
+
+class CachedResponse:
+    # The parts of requests.Response that callers use
+    def __init__(self, status_code, content, content_type=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {"Content-Type": content_type} if content_type else {}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class HttpCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL + NORMAL: a commit is an append to the log, not an fsync
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute(SCHEMA)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.max_bytes = max_bytes
+        self.size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+        self.touched = {}  # url -> last_used not yet written
+
+    def _lookup(self, url):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT status, content_type, body, etag, last_modified, expires_at FROM responses WHERE url = ?",
+                (url,)
+            ).fetchone()
+
+    def _hit(self, url, row, expires_at=None):
+        # Count a fresh hit, or a 304 revalidation that extends the entry to
+        # expires_at, and mark the entry as used
+        with self.lock:
+            self.bytes_saved += len(row[2])
+            if expires_at is None:
+                self.hits += 1
+                self.touched[url] = time.time()
+                if len(self.touched) >= TOUCH_BATCH:
+                    self._write_touched()
+                    self.conn.commit()
+            else:
+                self.revalidated += 1
+                self.touched.pop(url, None)
+                self.conn.execute(
+                    "UPDATE responses SET last_used = ?, expires_at = ? WHERE url = ?",
+                    (time.time(), expires_at, url)
+                )
+                self.conn.commit()
+
+    def _miss(self):
+        with self.lock:
+            self.misses += 1
+
+    def _write_touched(self):
+        # Caller holds the lock and commits
+        self.conn.executemany(
+            "UPDATE responses SET last_used = ? WHERE url = ?",
+            [(last_used, url) for url, last_used in self.touched.items()]
+        )
+        self.touched.clear()
+
+    def flush(self):
+        # Write queued last_used updates now (e.g. before exiting)
+        with self.lock:
+            if self.touched:
+                self._write_touched()
+                self.conn.commit()
+
+    def put(self, url, body, ttl, status=200, content_type=None, etag=None, last_modified=None):
+        now = time.time()
+        with self.lock:
+            self.touched.pop(url, None)
+            self._write_touched()
+            old = self.conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, status, content_type, body, etag, last_modified, now + ttl, now, len(body))
+            )
+            self.size += len(body) - (old[0] if old else 0)
+            if self.size > self.max_bytes:
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        # Drop least recently used entries until 90% of the cap is free again
+        target = self.max_bytes * 0.9
+        victims = []
+        for url, size in self.conn.execute("SELECT url, size FROM responses ORDER BY last_used"):
+            if self.size <= target:
+                break
+            victims.append((url,))
+            self.size -= size
+        self.conn.executemany("DELETE FROM responses WHERE url = ?", victims)
+        self.evictions += len(victims)
+
+    def get(self, url, ttl, session=None, **kwargs):
+        # GET through the cache (and the shared HTTP client unless another
+        # session is given); returns a CachedResponse or a requests.Response
+        row = self._lookup(url)
+        if row and row[5] > time.time():
+            self._hit(url, row)
+            return CachedResponse(row[0], row[2], row[1])
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if row and row[3]:
+            headers["If-None-Match"] = row[3]
+        if row and row[4]:
+            headers["If-Modified-Since"] = row[4]
+        if session is None:
+            from http_client import default_client
+            session = default_client()
+        response = session.get(url, headers=headers, **kwargs)
+
+        if row and response.status_code == 304:
+            self._hit(url, row, time.time() + ttl)
+            return CachedResponse(row[0], row[2], row[1])
+
+        self._miss()
+        if response.status_code == 200:
+            self.put(
+                url, response.content, ttl,
+                content_type=response.headers.get("Content-Type"),
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        return response
+
+    def get_json(self, key):
+        # Fresh JSON stored under key by put_json, or None
+        row = self._lookup(key)
+        if row and row[5] > time.time():
+            self._hit(key, row)
+            return json.loads(row[2])
+        self._miss()
+        return None
+
+    def put_json(self, key, value, ttl):
+        self.put(key, json.dumps(value).encode("utf-8"), ttl, content_type="application/json")
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "evictions": self.evictions,
+                "bytes_saved": self.bytes_saved,
+                "size": self.size,
+            }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"🗄️ Cache: {stats['hits']} hits, {stats['revalidated']} revalidated, {stats['misses']} misses, "
+                f"{stats['evictions']} evicted, {stats['bytes_saved'] / 1e6:.1f} MB not downloaded")
+
+
+def read_json(conn, key):
+    # Fresh JSON stored under key, read through a separate connection to the
+    # cache file without touching last_used or the counters (import workers)
+    row = conn.execute("SELECT body, expires_at FROM responses WHERE url = ?", (key,)).fetchone()
+    return json.loads(row[0]) if row and row[1] > time.time() else None
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_cache():
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = HttpCache()
+            atexit.register(_default.flush)
+        return _default
@@ -0,0 +1,167 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from instrument import LatencyHistogram
+
+# The one HTTP client behind every Scryfall, price and image request:
+#   - keep-alive sessions, one per thread (requests.Session is not guaranteed
+#     thread-safe), so repeat calls to a host reuse their TCP/TLS connection
+#   - at most MAX_PER_HOST requests in flight per host across all threads
+#   - connect/read timeouts on every request, so a stalled socket fails
+#     instead of hanging the GUI or an import
+#   - retries on connection errors, timeouts, 429 and 5xx with jittered
+#     exponential backoff; a Retry-After header sets the minimum wait
+#   - a latency histogram per host, printed by summary()
+# requests is imported on first use so importing this module stays cheap.
+
+CONNECT_TIMEOUT = float(os.environ.get("MTG_HTTP_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.environ.get("MTG_HTTP_READ_TIMEOUT", 30))
+MAX_PER_HOST = int(os.environ.get("MTG_HTTP_PER_HOST", 8))
+MAX_RETRIES = int(os.environ.get("MTG_HTTP_RETRIES", 4))
+BACKOFF = 0.5       # seconds before the first retry, doubled after each one
+MAX_BACKOFF = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Upper bounds of the latency buckets in milliseconds; the last bucket is open
+LATENCY_BOUNDS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class HostStats:
+    def __init__(self):
+        self.latency = LatencyHistogram(LATENCY_BOUNDS_MS)
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.failed = 0
+
+    def summary(self, host):
+        def ms(q):
+            bound = self.latency.percentile(q)
+            return f"≤{bound} ms" if bound else f">{LATENCY_BOUNDS_MS[-1]} ms"
+        mean = self.latency.total / self.latency.count() * 1000 if self.latency.count() else 0
+        return (f"🌐 {host}: {self.requests} requests, mean {mean:.0f} ms, p50 {ms(50)}, p95 {ms(95)}, "
+                f"{self.retries} retried ({self.throttled} throttled, {self.timeouts} timed out), "
+                f"{self.failed} failed")
+
+
+def retry_after(response):
+    # Seconds asked for by a Retry-After header (delay or HTTP date), or None
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, response=None):
+    # Full jitter: anywhere up to BACKOFF * 2^attempt, so clients that failed
+    # together do not retry together; never sooner than Retry-After
+    delay = random.uniform(0, min(MAX_BACKOFF, BACKOFF * 2 ** attempt))
+    wait = retry_after(response)
+    return delay if wait is None else wait + delay / 4
+
+
+class HttpClient:
+    def __init__(self, max_per_host=MAX_PER_HOST, max_retries=MAX_RETRIES,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)):
+        self.max_per_host = max_per_host
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.slots = {}   # host -> BoundedSemaphore
+        self.hosts = {}   # host -> HostStats
+
+    def session(self):
+        import requests
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def host(self, url):
+        # (semaphore, stats) of the URL's host
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.slots:
+                self.slots[host] = threading.BoundedSemaphore(self.max_per_host)
+                self.hosts[host] = HostStats()
+            return self.slots[host], self.hosts[host]
+
+    def request(self, method, url, before_attempt=None, on_retry=None, **kwargs):
+        # Like requests.request, with retries. before_attempt() runs before
+        # every try (e.g. a rate limiter); on_retry(status or exception) after
+        # every failed one. Returns the last response, even a 429/5xx once
+        # retries run out; raises requests.RequestException when the last
+        # try never got a response.
+        import requests
+        kwargs.setdefault("timeout", self.timeout)
+        slots, stats = self.host(url)
+        for attempt in range(self.max_retries + 1):
+            if before_attempt:
+                before_attempt()
+            error = response = None
+            started = time.monotonic()
+            with slots:
+                try:
+                    response = self.session().request(method, url, **kwargs)
+                except requests.RequestException as e:
+                    error = e
+            with self.lock:
+                stats.requests += 1
+                stats.latency.record(time.monotonic() - started)
+                retrying = attempt < self.max_retries and (
+                    error is not None or response.status_code in RETRY_STATUSES
+                )
+                if retrying:
+                    stats.retries += 1
+                    stats.throttled += response is not None and response.status_code == 429
+                    stats.timeouts += isinstance(error, requests.Timeout)
+                elif error is not None:
+                    stats.failed += 1
+            if not retrying:
+                if error is not None:
+                    raise error
+                return response
+            if on_retry:
+                on_retry(error if error is not None else response.status_code)
+            if response is not None:
+                response.close()
+            time.sleep(backoff_delay(attempt, response))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def summary(self, histogram=False):
+        with self.lock:
+            lines = []
+            for host, stats in sorted(self.hosts.items()):
+                lines.append(stats.summary(host))
+                if histogram:
+                    lines.extend("   " + line for line in stats.latency.lines())
+        return "\n".join(lines) or "🌐 No HTTP requests"
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_client():
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = HttpClient()
+        return _default
@@ -0,0 +1,167 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from io import BytesIO
+
+from instrument import span
+
+# Display-size card images keyed by card_id. Each printing is downloaded and
+# resized once, then kept as a small encoded thumbnail in its own SQLite file,
+# so browsing the collection later needs no download and no resize. The least
+# recently viewed thumbnails are evicted once the byte budget is reached.
+# Pillow and requests are imported on first use, not when the GUI starts;
+# downloads go through the shared HTTP client.
+
+STORE_PATH = os.environ.get("MTG_IMAGE_STORE", "card_images.db")
+MAX_BYTES = int(float(os.environ.get("MTG_IMAGE_STORE_MB", 1024)) * 1024 * 1024)
+
+IMAGE_SIZE = (250, 350)
+QUALITY = 85
+# Views only queue their last_used update; the queue is written with the
+# next put or once it holds this many entries
+TOUCH_BATCH = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS thumbnails (
+    card_id INTEGER PRIMARY KEY,
+    image_url TEXT,
+    body BLOB,
+    last_used REAL,
+    size INTEGER
+)
+"""
+
+
+@lru_cache(maxsize=None)
+def image_format():
+    # WebP is about 40% smaller than JPEG at the same quality when Pillow has it
+    from PIL import features
+    return "WEBP" if features.check("webp") else "JPEG"
+
+
+def make_thumbnail(data):
+    # Full-size download -> (display-size PIL image, encoded thumbnail bytes)
+    from PIL import Image
+    image = Image.open(BytesIO(data)).convert("RGB").resize(IMAGE_SIZE)
+    out = BytesIO()
+    image.save(out, image_format(), quality=QUALITY)
+    return image, out.getvalue()
+
+
+class ImageStore:
+    def __init__(self, path=STORE_PATH, max_bytes=MAX_BYTES):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL + NORMAL: a commit is an append to the log, not an fsync
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute(SCHEMA)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_thumbnails_last_used ON thumbnails(last_used)")
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.max_bytes = max_bytes
+        self.size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM thumbnails").fetchone()[0]
+        self.hits = 0
+        self.downloads = 0
+        self.evictions = 0
+        self.touched = {}  # card_id -> last_used not yet written
+
+    def stored_ids(self):
+        # card_id -> image_url of every stored thumbnail
+        with self.lock:
+            return dict(self.conn.execute("SELECT card_id, image_url FROM thumbnails"))
+
+    def get(self, card_id, image_url):
+        # Stored thumbnail as a PIL image, or None (also when the card's image URL changed)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body FROM thumbnails WHERE card_id = ? AND image_url = ?", (card_id, image_url)
+            ).fetchone()
+            if row is None:
+                return None
+            self.hits += 1
+            self.touched[card_id] = time.time()
+            if len(self.touched) >= TOUCH_BATCH:
+                self._write_touched()
+                self.conn.commit()
+        from PIL import Image
+        return Image.open(BytesIO(row[0]))
+
+    def _write_touched(self):
+        # Caller holds the lock and commits
+        self.conn.executemany(
+            "UPDATE thumbnails SET last_used = ? WHERE card_id = ?",
+            [(last_used, card_id) for card_id, last_used in self.touched.items()]
+        )
+        self.touched.clear()
+
+    def flush(self):
+        # Write queued last_used updates now (e.g. before exiting)
+        with self.lock:
+            if self.touched:
+                self._write_touched()
+                self.conn.commit()
+
+    def put(self, card_id, image_url, body):
+        with self.lock:
+            # Eviction orders by last_used, so queued views go in first
+            self.touched.pop(card_id, None)
+            self._write_touched()
+            old = self.conn.execute("SELECT size FROM thumbnails WHERE card_id = ?", (card_id,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?, ?, ?)",
+                (card_id, image_url, body, time.time(), len(body))
+            )
+            self.size += len(body) - (old[0] if old else 0)
+            if self.size > self.max_bytes:
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        # Drop least recently viewed thumbnails until 90% of the budget is free again
+        target = self.max_bytes * 0.9
+        victims = []
+        for card_id, size in self.conn.execute("SELECT card_id, size FROM thumbnails ORDER BY last_used"):
+            if self.size <= target:
+                break
+            victims.append((card_id,))
+            self.size -= size
+        self.conn.executemany("DELETE FROM thumbnails WHERE card_id = ?", victims)
+        self.evictions += len(victims)
+
+    def fetch(self, card_id, image_url, session=None):
+        # Thumbnail for a card, downloading and resizing it only the first time
+        image = self.get(card_id, image_url)
+        if image is not None:
+            return image
+        if session is None:
+            from http_client import default_client
+            session = default_client()
+        with span("image.download"):
+            response = session.get(image_url)
+            response.raise_for_status()
+        with span("image.resize"):
+            image, body = make_thumbnail(response.content)
+        self.put(card_id, image_url, body)
+        with self.lock:
+            self.downloads += 1
+        return image
+
+    def summary(self):
+        return (f"🖼️ Images: {self.hits} from store, {self.downloads} downloaded, {self.evictions} evicted, "
+                f"{self.size / 1e6:.1f} of {self.max_bytes / 1e6:.0f} MB used")
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ImageStore()
+            atexit.register(_default.flush)
+        return _default
@@ -0,0 +1,160 @@
+import csv
+import datetime
+import hashlib
+import os
+import time
+
+# Checkpoints for CSV imports. Every committed chunk records how many rows
+# and bytes of the file it covers, in the same transaction as the chunk's
+# writes, so an interrupted import resumes exactly after the last commit.
+# Files are identified by content hash, so a renamed or moved copy resumes
+# too, and a file that already finished is not added to the collection twice.
+
+JOURNAL_SQL = """
+CREATE TABLE IF NOT EXISTS ImportJournal (
+    file_hash TEXT PRIMARY KEY,
+    file_name TEXT,
+    rows_done INTEGER,
+    byte_offset INTEGER,
+    started_at TEXT,
+    updated_at TEXT,
+    finished_at TEXT
+)
+"""
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_header(f):
+    # Column names from the first line of a CSV opened in binary mode
+    return next(csv.reader([f.readline().decode("utf-8-sig")]))
+
+
+def csv_rows(header, lines, position):
+    # Parse byte lines that start at `position` in the file into (row dict,
+    # byte offset just past the row). csv.reader pulls one line at a time, so
+    # after each row the offset is exactly where that row ended, even for
+    # quoted fields that span lines.
+    def decoded():
+        nonlocal position
+        for line in lines:
+            position += len(line)
+            yield line.decode("utf-8")
+
+    for values in csv.reader(decoded()):
+        if values:
+            yield dict(zip(header, values)), position
+
+
+def read_csv(path, offset=0):
+    # Yield (row dict, byte offset just past the row), starting at a byte
+    # offset from an earlier run
+    with open(path, "rb") as f:
+        header = read_header(f)
+        if offset:
+            f.seek(offset)
+        yield from csv_rows(header, iter(f.readline, b""), f.tell())
+
+
+def read_shards(path, offset=0, shard_rows=5000):
+    # Cut the file from offset into (header, start offset, raw bytes) pieces
+    # of about shard_rows lines for worker processes to parse. A piece only
+    # ends where the quote count is even, so no quoted field is split.
+    with open(path, "rb") as f:
+        header = read_header(f)
+        if offset:
+            f.seek(offset)
+        start = f.tell()
+        lines, quotes = [], 0
+        for line in iter(f.readline, b""):
+            lines.append(line)
+            quotes += line.count(b'"')
+            if len(lines) >= shard_rows and quotes % 2 == 0:
+                data = b"".join(lines)
+                yield header, start, data
+                start += len(data)
+                lines, quotes = [], 0
+        if lines:
+            yield header, start, b"".join(lines)
+
+
+def now():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+class ImportJournal:
+    def __init__(self, conn, path):
+        self.conn = conn
+        self.path = path
+        self.file_hash = file_hash(path)
+        self.file_size = os.path.getsize(path)
+        row = conn.execute(
+            "SELECT rows_done, byte_offset, finished_at FROM ImportJournal WHERE file_hash = ?",
+            (self.file_hash,)
+        ).fetchone()
+        self.rows_done, self.byte_offset, self.finished_at = row or (0, 0, None)
+        self.resumed = row is not None and not self.finished_at
+        if row is None:
+            conn.execute(
+                "INSERT INTO ImportJournal VALUES (?, ?, 0, 0, ?, ?, NULL)",
+                (self.file_hash, os.path.basename(path), now(), now())
+            )
+            conn.commit()
+        # Position of the newest row handed to the writer
+        self.pending = (self.rows_done, self.byte_offset)
+
+    def advance(self, byte_offset):
+        self.pending = (self.pending[0] + 1, byte_offset)
+
+    def record(self, *args):
+        # Called by BulkWriter right before it commits a chunk
+        self.rows_done, self.byte_offset = self.pending
+        self.conn.execute(
+            "UPDATE ImportJournal SET rows_done = ?, byte_offset = ?, updated_at = ? WHERE file_hash = ?",
+            (self.rows_done, self.byte_offset, now(), self.file_hash)
+        )
+
+    def finish(self):
+        self.finished_at = now()
+        self.conn.execute(
+            "UPDATE ImportJournal SET finished_at = ?, updated_at = ? WHERE file_hash = ?",
+            (self.finished_at, self.finished_at, self.file_hash)
+        )
+        self.conn.commit()
+
+
+class Progress:
+    # One self-overwriting status line: rows, rows/s, share of the file and ETA
+    def __init__(self, journal, interval=0.5):
+        self.journal = journal
+        self.interval = interval
+        self.started = time.monotonic()
+        self.start_offset = journal.byte_offset
+        self.start_rows = journal.rows_done
+        # First line after one interval, once there is a rate to show
+        self.shown = self.started
+
+    def update(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.shown < self.interval:
+            return
+        self.shown = now
+        rows, offset = self.journal.pending
+        elapsed = max(now - self.started, 1e-6)
+        rate = (rows - self.start_rows) / elapsed
+        byte_rate = (offset - self.start_offset) / elapsed
+        share = offset / self.journal.file_size if self.journal.file_size else 1.0
+        eta = (self.journal.file_size - offset) / byte_rate if byte_rate else 0
+        print(f"\r⏳ {rows:,} rows ({rate:,.0f}/s), {share:.0%} of file, ETA {int(eta // 60)}m{int(eta % 60):02d}s ",
+              end="", flush=True)
+
+    def message(self, text):
+        # Print a line without garbling the status line
+        print("\r" + text.ljust(70))
+        self.shown = 0.0
@@ -0,0 +1,251 @@
+import os
+import sqlite3
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from bulk_writer import DEFAULT_CHUNK_SIZE, BulkWriter, card_record
+from card_matcher import CardMatcher
+from catalog import find_card_id
+from collection_ledger import compact_if_due
+from http_cache import CACHE_PATH, default_cache, read_json
+from import_journal import ImportJournal, Progress, csv_rows, read_csv, read_shards
+from instrument import span, timed_iter
+from resolver import CardResolver
+from scryfall import card_url, resolve_cards
+
+# CSV import into the collection without any prompts: the file streams from
+# its journal checkpoint, printings resolve through CardResolver and rows are
+# written a chunk at a time by BulkWriter, each chunk committed together with
+# its checkpoint. Import_csv_current is the interactive wrapper around it.
+#
+# ParallelImporter spreads the per-row Python work (CSV parsing, catalog and
+# cache lookups, JSON decoding, field extraction) over worker processes. The
+# main process stays the only writer: it applies the workers' results in
+# file order, so SQLite sees one connection and the journal stays exact.
+#
+# Rows that neither the catalog nor Scryfall resolve (misspelt names, other
+# sites' set codes, no collector number) go through CardMatcher, and are
+# imported when the match is unambiguous and confident enough.
+
+SHARD_ROWS = 5000
+MIN_CONFIDENCE = 0.8
+
+
+def parse_quantity(value):
+    # "3", " 2x", "x3" -> int; a blank quantity is one copy and anything still
+    # not a whole number ("1/2", "two") is None, for the row to be reviewed
+    text = (value or "").strip()
+    if not text:
+        return 1
+    try:
+        return int(text.lower().strip("x").strip())
+    except ValueError:
+        return None
+
+
+def parse_row(row):
+    # CSV dict -> (name, set_code, collector_number, quantity); only name is
+    # required, intake lists often lack the others. quantity is None when
+    # it cannot be read.
+    return (
+        row['name'],
+        (row.get('set_code') or row.get('set') or "").strip().strip("()").lower(),
+        (row.get('collector_number') or "").strip(),
+        parse_quantity(row.get('quantity')),
+    )
+
+
+def row_label(name, set_code, collector_number):
+    # "Shock (M21 #159)", leaving out whatever the row does not have
+    printing = " ".join(filter(None, [set_code.upper(), collector_number and f"#{collector_number}"]))
+    return f"{name} ({printing})" if printing else name
+
+
+class Importer:
+    def __init__(self, repository, chunk_size=DEFAULT_CHUNK_SIZE, show_progress=True,
+                 min_confidence=MIN_CONFIDENCE):
+        self.repository = repository
+        self.chunk_size = chunk_size
+        self.show_progress = show_progress
+        # Fuzzy matches below this are not imported; None turns matching off
+        self.min_confidence = min_confidence
+        self.matcher = None
+        self.resolver = CardResolver(repository)
+        self.stats = self.resolver.stats
+        self.imported = 0
+        self.local_hits = 0
+        self.matched = 0
+        self.missing = 0
+        self.bad_quantity = 0
+
+    def journal(self, path, force=False):
+        # Checkpoint for path. A finished file keeps its finished_at (and is
+        # not imported again) unless force starts it over.
+        conn = self.repository.conn
+        journal = ImportJournal(conn, path)
+        if journal.finished_at and force:
+            conn.execute("DELETE FROM ImportJournal WHERE file_hash = ?", (journal.file_hash,))
+            conn.commit()
+            journal = ImportJournal(conn, path)
+        return journal
+
+    def resolved_rows(self, journal):
+        # (name, set_code, collector_number, quantity, offset, card_id, record)
+        # for every row after the checkpoint, in file order; card_id when the
+        # catalog has the printing, else a card_record() or None when unknown
+        rows = timed_iter("import.parse", (
+            parse_row(row) + (offset,) for row, offset in read_csv(journal.path, journal.byte_offset)
+        ))
+        for row, card_id, card in self.resolver.resolve_rows(rows, key=lambda r: (r[1], r[2])):
+            yield row + (card_id, card_record(card) if card is not None else None)
+
+    def run(self, journal):
+        # Import the rest of the journal's file and mark it finished
+        progress = Progress(journal)
+        writer = BulkWriter(self.repository.conn, self.chunk_size, before_commit=journal.record,
+                            source=f"import {os.path.basename(journal.path)}")
+        # import.resolve is the time spent waiting for the next resolved row
+        rows = timed_iter("import.resolve", self.resolved_rows(journal))
+        for name, set_code, collector_number, quantity, offset, card_id, record in rows:
+            journal.advance(offset)
+            if quantity is None:
+                writer.skip()
+                self.bad_quantity += 1
+                if self.show_progress:
+                    progress.message(f"❌ Unreadable quantity: {row_label(name, set_code, collector_number)}")
+            elif card_id is not None:
+                writer.add_card_id(card_id, quantity)
+                self.imported += 1
+                self.local_hits += 1
+            elif record is not None:
+                writer.add_record(record, quantity)
+                self.imported += 1
+            else:
+                match = self.fuzzy_match(name, set_code, collector_number)
+                if match is not None and match.accepted(self.min_confidence):
+                    writer.add_card_id(match.card_id, quantity)
+                    self.imported += 1
+                    self.matched += 1
+                    if self.show_progress:
+                        _, matched_name, code, number = match.candidates[0]
+                        progress.message(f"🔎 Matched: {row_label(name, set_code, collector_number)} -> "
+                                         f"{row_label(matched_name, code, number)}, {match.confidence:.0%}")
+                    continue
+                writer.skip()
+                self.missing += 1
+                if self.show_progress:
+                    note = f", {len(match.candidates)} possible cards" if match and match.status == "ambiguous" else ""
+                    progress.message(f"❌ Could not find: {row_label(name, set_code, collector_number)}{note}")
+            if self.show_progress:
+                progress.update()
+
+        writer.close()
+        journal.finish()
+        compact_if_due(self.repository.conn)
+        if self.show_progress:
+            progress.update(force=True)
+
+    def fuzzy_match(self, name, set_code, collector_number):
+        # CardMatcher result for a row nothing else resolved; the index is
+        # built from the catalog the first time it is needed
+        if self.min_confidence is None:
+            return None
+        if self.matcher is None:
+            with span("import.match_index"):
+                self.matcher = CardMatcher(self.repository.conn)
+        with span("import.match"):
+            return self.matcher.match(name, set_code, collector_number)
+
+    def import_file(self, path, force=False):
+        # Headless entry point for batch jobs; False when the file was
+        # already imported and force is not set
+        journal = self.journal(path, force)
+        if journal.finished_at:
+            return False
+        self.run(journal)
+        return True
+
+
+# Read-only connections of a worker process, opened once by _init_worker
+_worker = {}
+
+
+def _init_worker(db_path, cache_path):
+    # WAL lets these readers run while the main process writes
+    _worker["catalog"] = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        _worker["cache"] = sqlite3.connect(f"file:{cache_path}?mode=ro", uri=True)
+    except sqlite3.OperationalError:
+        _worker["cache"] = None  # no cache file yet
+
+
+def resolve_shard(header, start, data):
+    # Worker process: parse one piece of the CSV and resolve what can be
+    # resolved without the network. Returns (rows, records): rows as
+    # (name, set_code, collector_number, quantity, offset, card_id, scryfall_id),
+    # with both ids None for rows the main process must look up, and
+    # records {scryfall_id: card_record} holding each cached card once.
+    cursor = _worker["catalog"].cursor()
+    cache = _worker["cache"]
+    found = {}  # (set_code, collector_number) -> (card_id, scryfall_id)
+    records = {}
+    rows = []
+    for row, offset in csv_rows(header, iter(data.splitlines(keepends=True)), start):
+        name, set_code, collector_number, quantity = parse_row(row)
+        identifier = (set_code, collector_number)
+        if identifier not in found:
+            card_id, scryfall_id = find_card_id(cursor, set_code, collector_number), None
+            if card_id is None and cache is not None:
+                try:
+                    card = read_json(cache, card_url(set_code, collector_number))
+                except sqlite3.OperationalError:
+                    card = None  # busy cache; the main process looks it up instead
+                if card is not None:
+                    record = card_record(card)
+                    scryfall_id = record[2][0]
+                    records[scryfall_id] = record
+            found[identifier] = (card_id, scryfall_id)
+        rows.append((name, set_code, collector_number, quantity, offset) + found[identifier])
+    return rows, records
+
+
+class ParallelImporter(Importer):
+    def __init__(self, repository, workers, chunk_size=DEFAULT_CHUNK_SIZE, show_progress=True,
+                 shard_rows=SHARD_ROWS, min_confidence=MIN_CONFIDENCE):
+        super().__init__(repository, chunk_size, show_progress, min_confidence)
+        self.workers = workers
+        self.shard_rows = shard_rows
+
+    def shard_results(self, journal):
+        # Worker rows in file order, with at most two shards per worker in flight.
+        # Opening the cache here first rolls back a write that an earlier run
+        # was killed in, which read-only worker connections cannot do.
+        default_cache()
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                 initargs=(self.repository.path, CACHE_PATH)) as pool:
+            pending = deque()
+            for shard in read_shards(journal.path, journal.byte_offset, self.shard_rows):
+                pending.append(pool.submit(resolve_shard, *shard))
+                if len(pending) >= self.workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def resolved_rows(self, journal):
+        # Rows the workers could not resolve go to Scryfall through the one
+        # rate limiter in this process; resolve_cards asks for a printing
+        # that repeats in the file only once.
+        def rows():
+            for shard_rows, records in self.shard_results(journal):
+                for *row, card_id, scryfall_id in shard_rows:
+                    yield tuple(row) + (card_id, records.get(scryfall_id))
+
+        def lookup(row):
+            identifier = (row[1], row[2])
+            return identifier if row[5] is None and row[6] is None and all(identifier) else None
+
+        shards = timed_iter("import.shard_wait", rows())
+        for row, card in resolve_cards(shards, key=lookup, stats=self.stats):
+            if card is not None:
+                row = row[:6] + (card_record(card),)
+            yield row
@@ -0,0 +1,185 @@
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# Timing spans for the hot paths of the GUI and the importer. Off unless
+# MTG_TRACE is set (or enable() is called, e.g. from the GUI's Timings
+# window); when off, span() hands back a shared no-op context manager and
+# timed_iter() returns its iterable untouched, so instrumented code pays
+# about one function call per span.
+#
+#   with span("gui.query"):
+#       ...
+#
+# Every stage keeps a count, a total, a maximum and a latency histogram;
+# report_lines() lists them slowest total first. MTG_PROFILE=<file> runs the
+# main thread under cProfile between start_profile() and stop_profile(), which
+# writes the .prof file (for snakeviz or pstats) and prints the top entries.
+
+ENABLED = bool(os.environ.get("MTG_TRACE"))
+PROFILE_PATH = os.environ.get("MTG_PROFILE")
+
+# Upper bounds of the stage histogram buckets in milliseconds
+STAGE_BOUNDS_MS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+
+class LatencyHistogram:
+    # Counts per latency bucket; bounds_ms are the buckets' upper bounds and
+    # the last bucket is open
+    def __init__(self, bounds_ms):
+        self.bounds = bounds_ms
+        self.counts = [0] * (len(bounds_ms) + 1)
+        self.total = 0.0
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        for i, bound in enumerate(self.bounds):
+            if ms <= bound:
+                break
+        else:
+            i = len(self.bounds)
+        self.counts[i] += 1
+        self.total += seconds
+
+    def count(self):
+        return sum(self.counts)
+
+    def percentile(self, q):
+        # Upper bound in ms of the bucket holding the q-th percentile (0-100);
+        # None for an empty histogram or when it lands in the open bucket
+        target = self.count() * q / 100
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= target:
+                return self.bounds[i] if i < len(self.bounds) else None
+        return None
+
+    def lines(self):
+        # One text bar per non-empty bucket
+        widest = max(self.counts) or 1
+        labels = [f"≤{bound:g} ms" for bound in self.bounds] + [f">{self.bounds[-1]:g} ms"]
+        return [f"{label:>10} {'█' * max(1, round(n * 30 / widest))} {n}"
+                for label, n in zip(labels, self.counts) if n]
+
+
+class Stage:
+    def __init__(self):
+        self.histogram = LatencyHistogram(STAGE_BOUNDS_MS)
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.histogram.record(seconds)
+        self.max = max(self.max, seconds)
+
+
+_stages = {}
+_lock = threading.Lock()
+NO_SPAN = nullcontext()
+
+
+def record(name, seconds):
+    with _lock:
+        stage = _stages.get(name)
+        if stage is None:
+            stage = _stages[name] = Stage()
+        stage.record(seconds)
+
+
+class _Span:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.started)
+
+
+def span(name):
+    # Context manager timing one pass through a stage
+    return _Span(name) if ENABLED else NO_SPAN
+
+
+def timed_iter(name, iterable):
+    # Times each next() of an iterable as one pass through the stage, for
+    # generator pipelines whose work happens while they are being pulled
+    if not ENABLED:
+        return iterable
+    return _timed_iter(name, iter(iterable))
+
+
+def _timed_iter(name, iterator):
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        record(name, time.perf_counter() - started)
+        yield item
+
+
+def enable(on=True):
+    # Spans created from now on are recorded (or not)
+    global ENABLED
+    ENABLED = on
+
+
+def reset():
+    with _lock:
+        _stages.clear()
+
+
+def report_lines(histograms=False):
+    with _lock:
+        stages = sorted(_stages.items(), key=lambda item: item[1].histogram.total, reverse=True)
+        if not stages:
+            return ["⏱️ No timings recorded" + ("" if ENABLED else " (set MTG_TRACE=1 to record them)")]
+        lines = [f"{'stage':<22} {'count':>8} {'total ms':>10} {'mean ms':>9} {'p50':>8} {'p95':>8} {'max ms':>9}"]
+        for name, stage in stages:
+            histogram = stage.histogram
+            count = histogram.count()
+            p50, p95 = (histogram.percentile(q) for q in (50, 95))
+            lines.append(
+                f"{name:<22} {count:>8,} {histogram.total * 1000:>10.1f} {histogram.total * 1000 / count:>9.3f} "
+                f"{'≤%g' % p50 if p50 else '>%g' % STAGE_BOUNDS_MS[-1]:>8} "
+                f"{'≤%g' % p95 if p95 else '>%g' % STAGE_BOUNDS_MS[-1]:>8} {stage.max * 1000:>9.2f}"
+            )
+            if histograms:
+                lines.extend("   " + line for line in histogram.lines())
+        return lines
+
+
+def summary():
+    # Report for the end of a run; empty when nothing was traced
+    return "\n".join(["⏱️ Timings:"] + report_lines()) if _stages else ""
+
+
+_profiler = None
+
+
+def start_profile():
+    # Profile the calling thread when MTG_PROFILE names an output file
+    global _profiler
+    if PROFILE_PATH and _profiler is None:
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def stop_profile(top=25):
+    global _profiler
+    if _profiler is None:
+        return
+    import pstats
+    _profiler.disable()
+    _profiler.dump_stats(PROFILE_PATH)
+    print(f"🔬 Profile written to {PROFILE_PATH}; top {top} by cumulative time:")
+    pstats.Stats(_profiler).sort_stats("cumulative").print_stats(top)
+    _profiler = None
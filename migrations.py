@@ -0,0 +1,179 @@
+import sqlite3
+
+from card_matcher import SET_ALIASES_SQL
+from catalog import COLOR_NAMES, ensure_catalog_schema
+from collection_ledger import ensure_collection_ledger
+from collection_summary import ensure_collection_summary
+from import_journal import JOURNAL_SQL
+from price_series import SERIES_SQL, rebuild_series
+from search_index import ensure_search_index
+
+# Versioned schema for mtg_cards.db. Every entry point opens the database
+# through connect(), which applies the connection pragmas and runs whatever
+# migrations the file has not seen yet. The applied version is stored in
+# PRAGMA user_version. Migrations must stay idempotent because databases
+# created before versioning start at version 0 with some tables present.
+
+DB_PATH = "mtg_cards.db"
+
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",     # readers (GUI query thread) never block the writer
+    "PRAGMA synchronous = NORMAL",   # safe with WAL, far fewer fsyncs
+    "PRAGMA cache_size = -65536",    # 64 MB page cache
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",  # 256 MB
+]
+
+BASE_TABLES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS CardTypes (
+        type_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type_name TEXT UNIQUE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Card_CardTypes (
+        card_id INTEGER,
+        type_id INTEGER,
+        PRIMARY KEY (card_id, type_id),
+        FOREIGN KEY (card_id) REFERENCES Cards(card_id),
+        FOREIGN KEY (type_id) REFERENCES CardTypes(type_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS CardColors (
+        color_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        color_name TEXT UNIQUE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Card_CardColors (
+        card_id INTEGER,
+        color_id INTEGER,
+        PRIMARY KEY (card_id, color_id),
+        FOREIGN KEY (card_id) REFERENCES Cards(card_id),
+        FOREIGN KEY (color_id) REFERENCES CardColors(color_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Collection (
+        card_id INTEGER PRIMARY KEY,
+        quantity INTEGER,
+        FOREIGN KEY (card_id) REFERENCES Cards(card_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS PriceHistory (
+        card_id INTEGER,
+        date TEXT,
+        usd_price REAL,
+        FOREIGN KEY (card_id) REFERENCES Cards(card_id)
+    )
+    """,
+]
+
+INDEXES_SQL = [
+    # Cards.set_id joins are served by idx_cards_set_number (set_id, collector_number)
+    "CREATE INDEX IF NOT EXISTS idx_cards_rarity ON Cards(rarity)",
+    "CREATE INDEX IF NOT EXISTS idx_price_history_card_date ON PriceHistory(card_id, date)",
+    "CREATE INDEX IF NOT EXISTS idx_card_types_type ON Card_CardTypes(type_id, card_id)",
+    "CREATE INDEX IF NOT EXISTS idx_card_colors_color ON Card_CardColors(color_id, card_id)",
+]
+
+
+def base_schema(conn):
+    # One definition for every table; replaces the per-script CREATE TABLEs.
+    # An older Cards table (cmc INTEGER, rarity CHECK, UNIQUE(card_name, set_id))
+    # is rebuilt into the catalog layout.
+    ensure_catalog_schema(conn)
+    for sql in BASE_TABLES_SQL:
+        conn.execute(sql)
+
+
+def search_index(conn):
+    ensure_search_index(conn)
+
+
+def secondary_indexes(conn):
+    for sql in INDEXES_SQL:
+        conn.execute(sql)
+    conn.execute("ANALYZE")
+
+
+def unique_price_days(conn):
+    # Price snapshots upsert on (card_id, date), so keep only the newest row
+    # of any day recorded twice and make the lookup index unique
+    conn.execute("""
+        DELETE FROM PriceHistory WHERE rowid NOT IN (
+            SELECT MAX(rowid) FROM PriceHistory GROUP BY card_id, date
+        )
+    """)
+    conn.execute("DROP INDEX IF EXISTS idx_price_history_card_date")
+    conn.execute("CREATE UNIQUE INDEX idx_price_history_card_date ON PriceHistory(card_id, date)")
+
+
+def price_series(conn):
+    conn.execute(SERIES_SQL)
+    rebuild_series(conn)
+
+
+def card_colors(conn):
+    # Catalog loads fill Card_CardColors by name, so the five colors must
+    # exist; cards already in the catalog get theirs on the next bulk load
+    conn.executemany("INSERT OR IGNORE INTO CardColors (color_name) VALUES (?)", [(n,) for n in COLOR_NAMES.values()])
+
+
+def import_journal(conn):
+    conn.execute(JOURNAL_SQL)
+
+
+def collection_summary(conn):
+    ensure_collection_summary(conn)
+
+
+def set_aliases(conn):
+    conn.execute(SET_ALIASES_SQL)
+
+
+def collection_ledger(conn):
+    # Existing quantities become the ledger's opening balance
+    ensure_collection_ledger(conn)
+
+
+MIGRATIONS = [
+    (1, base_schema),
+    (2, search_index),
+    (3, secondary_indexes),
+    (4, unique_price_days),
+    (5, price_series),
+    (6, card_colors),
+    (7, import_journal),
+    (8, collection_summary),
+    (9, set_aliases),
+    (10, collection_ledger),
+]
+
+LATEST = MIGRATIONS[-1][0]
+
+
+def tune(conn):
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def migrate(conn, target=LATEST):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in MIGRATIONS:
+        if version < number <= target:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+            version = number
+    return version
+
+
+def connect(path=DB_PATH, **kwargs):
+    conn = tune(sqlite3.connect(path, **kwargs))
+    migrate(conn)
+    return conn
@@ -0,0 +1,46 @@
+import numpy as np
+from matplotlib.figure import Figure
+
+# Price chart for the GUI detail pane. One Figure, Axes, line and canvas are
+# built once and every card selection only swaps the line data, so nothing
+# is re-created per click. The Figure is made without pyplot, which means
+# pyplot never holds on to it.
+
+# Series longer than this are drawn without point markers
+MARKER_POINTS = 60
+
+
+class PriceChart:
+    def __init__(self, master=None, figsize=(4, 3)):
+        self.figure = Figure(figsize=figsize)
+        self.ax = self.figure.add_subplot()
+        self.ax.set_title("Price Over Time")
+        self.ax.set_xlabel("Date")
+        self.ax.set_ylabel("USD Price")
+        self.ax.xaxis_date()
+        self.ax.tick_params(axis='x', rotation=45)
+        self.line, = self.ax.plot(np.empty(0, dtype="datetime64[D]"), np.empty(0))
+        self.figure.tight_layout()
+
+        if master is None:
+            # Off-screen canvas, used by bench_chart_memory.py
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            self.canvas = FigureCanvasAgg(self.figure)
+        else:
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+            self.canvas.get_tk_widget().pack()
+
+    def show(self, dates, prices):
+        # dates: datetime64 array, prices: float array (as from load_series)
+        self.line.set_data(dates, prices)
+        self.line.set_marker('o' if 0 < len(dates) <= MARKER_POINTS else '')
+        self.line.set_visible(len(dates) > 0)
+        self.ax.set_title("Price Over Time" if len(dates) else "No price history")
+        if len(dates):
+            self.ax.relim()
+            self.ax.autoscale_view()
+        self.canvas.draw_idle()
+
+    def clear(self):
+        self.show(np.empty(0, dtype="datetime64[D]"), np.empty(0))
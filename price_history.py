@@ -0,0 +1,80 @@
+import os
+import re
+
+from catalog import iter_json_array
+from price_series import add_day
+from scryfall import resolve_cards
+
+# Daily price snapshots for every card in Collection. A snapshot is written
+# with one executemany per day and upserts on (card_id, date), so re-running
+# a day replaces its prices instead of adding duplicate rows. Prices come
+# from a Scryfall bulk file (current or archived) or from batched
+# /cards/collection calls.
+
+UPSERT_PRICE_SQL = """
+    INSERT INTO PriceHistory (card_id, date, usd_price) VALUES (?, ?, ?)
+    ON CONFLICT(card_id, date) DO UPDATE SET usd_price = excluded.usd_price
+    WHERE PriceHistory.usd_price IS NOT excluded.usd_price
+"""
+
+# Scryfall names bulk files like default-cards-20240512090507.json
+BULK_FILE_DATE = re.compile(r"(\d{4})(\d{2})(\d{2})\d{6}")
+
+
+def card_price(card):
+    price = (card.get('prices') or {}).get('usd')
+    return float(price) if price else None
+
+
+def bulk_file_date(path):
+    # Snapshot date (YYYY-MM-DD) of an archived bulk file; None when the name has no timestamp
+    match = BULK_FILE_DATE.search(os.path.basename(path))
+    return "-".join(match.groups()) if match else None
+
+
+def collection_cards(conn):
+    return conn.execute("""
+        SELECT Cards.card_id, Cards.scryfall_id, Sets.code, Cards.collector_number, Cards.card_name
+        FROM Collection
+        JOIN Cards ON Collection.card_id = Cards.card_id
+        JOIN Sets ON Cards.set_id = Sets.set_id
+    """).fetchall()
+
+
+def bulk_prices(conn, path):
+    # Stream a bulk file once and pick out the owned printings. Cards written
+    # before the catalog have no scryfall_id and are matched by set and name.
+    owned = collection_cards(conn)
+    by_id = {scryfall_id: card_id for card_id, scryfall_id, _, _, _ in owned if scryfall_id}
+    by_name = {(code, name): card_id for card_id, scryfall_id, code, _, name in owned if not scryfall_id}
+
+    prices = {}
+    for card in iter_json_array(path):
+        card_id = by_id.get(card.get('id'))
+        if card_id is None and by_name:
+            card_id = by_name.get((card.get('set'), card.get('name')))
+        price = card_price(card) if card_id is not None else None
+        if price is not None:
+            prices.setdefault(card_id, price)
+    return prices, len(owned)
+
+
+def api_prices(conn, stats=None):
+    # Today's prices through /cards/collection, bypassing the card cache.
+    # Rows without a collector number cannot be looked up that way.
+    owned = [row for row in collection_cards(conn) if row[3]]
+    prices = {}
+    for row, card in resolve_cards(owned, key=lambda r: (r[2], r[3]), stats=stats, cached=False):
+        price = card_price(card) if card else None
+        if price is not None:
+            prices[row[0]] = price
+    return prices, len(owned)
+
+
+def write_snapshot(conn, date, prices):
+    # prices: {card_id: usd_price}; one executemany and one commit per day.
+    # The chart series in PriceSeries are updated in the same transaction.
+    conn.executemany(UPSERT_PRICE_SQL, [(card_id, date, price) for card_id, price in prices.items()])
+    add_day(conn, date, prices)
+    conn.commit()
+    return len(prices)
@@ -0,0 +1,158 @@
+import json
+from itertools import groupby
+
+# Compact read path for price charts. PriceHistory stays the raw log that
+# snapshots write to; PriceSeries keeps one row per card and resolution
+# holding the whole series as two packed int32 arrays: day numbers (days
+# since 1970-01-01) and prices in cents. A chart reads a single row and
+# decodes it with np.frombuffer, however many years of history there are.
+# Weekly and monthly rollups keep the last snapshot of each week/month.
+# NumPy is imported by the functions that use it: migrations imports this
+# module, and opening the database should not pay for NumPy.
+
+SERIES_SQL = """
+CREATE TABLE IF NOT EXISTS PriceSeries (
+    card_id INTEGER,
+    resolution TEXT,
+    first_day INTEGER,
+    last_day INTEGER,
+    days BLOB,
+    cents BLOB,
+    PRIMARY KEY (card_id, resolution),
+    FOREIGN KEY (card_id) REFERENCES Cards(card_id)
+) WITHOUT ROWID
+"""
+
+RESOLUTIONS = ("day", "week", "month")
+# Finest resolution whose series still fits in this many points is picked
+# when the caller does not ask for one
+MAX_POINTS = 200
+
+PACKED = "<i4"  # little-endian int32
+
+
+def day_number(value):
+    # 'YYYY-MM-DD' (or date / datetime64) -> days since 1970-01-01
+    import numpy as np
+    return int(np.datetime64(str(value)[:10], "D").astype(np.int64))
+
+
+def to_cents(usd):
+    return int(round(usd * 100))
+
+
+def rollup(days, cents, resolution):
+    # Keep the last point of each week (Monday to Sunday) or calendar month
+    import numpy as np
+    if resolution == "day" or not len(days):
+        return days, cents
+    if resolution == "week":
+        buckets = (days + 3) // 7  # 1970-01-01 was a Thursday
+    else:
+        buckets = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    last = np.flatnonzero(np.r_[buckets[1:] != buckets[:-1], True])
+    return days[last], cents[last]
+
+
+def series_rows(card_id, days, cents):
+    import numpy as np
+    days = np.asarray(days, dtype=PACKED)
+    cents = np.asarray(cents, dtype=PACKED)
+    for resolution in RESOLUTIONS:
+        d, c = rollup(days, cents, resolution)
+        yield card_id, resolution, int(d[0]), int(d[-1]), d.tobytes(), c.tobytes()
+
+
+def _write(conn, rows):
+    conn.executemany("INSERT OR REPLACE INTO PriceSeries VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+
+def rebuild_series(conn, card_ids=None):
+    # Rebuild series from PriceHistory, for every card or just card_ids.
+    # Dates are converted to day numbers in SQL so rows arrive as integers.
+    query = """
+        SELECT card_id, CAST(julianday(date) - 2440587.5 AS INTEGER), usd_price
+        FROM PriceHistory WHERE usd_price IS NOT NULL AND julianday(date) IS NOT NULL
+    """
+    params = ()
+    if card_ids is not None:
+        query += " AND card_id IN (SELECT value FROM json_each(?))"
+        params = (json.dumps(list(card_ids)),)
+    query += " ORDER BY card_id, date"
+
+    if card_ids is None:
+        conn.execute("DELETE FROM PriceSeries")
+    else:
+        conn.executemany("DELETE FROM PriceSeries WHERE card_id = ?", ((card_id,) for card_id in card_ids))
+
+    rows = []
+    for card_id, points in groupby(conn.execute(query, params), key=lambda row: row[0]):
+        points = list(points)
+        rows.extend(series_rows(card_id, [p[1] for p in points], [to_cents(p[2]) for p in points]))
+        if len(rows) >= 3000:
+            _write(conn, rows)
+            rows.clear()
+    _write(conn, rows)
+    conn.commit()
+
+
+def add_day(conn, date, prices):
+    # Merge one snapshot day ({card_id: usd_price}) into the stored series.
+    # Appending the newest day is the common case; backfilled or repeated
+    # days are inserted or replaced in place.
+    import numpy as np
+    day = day_number(date)
+    stored = {}
+    for card_id, days, cents in conn.execute("""
+        SELECT card_id, days, cents FROM PriceSeries
+        WHERE resolution = 'day' AND card_id IN (SELECT value FROM json_each(?))
+    """, (json.dumps(list(prices)),)):
+        stored[card_id] = (np.frombuffer(days, dtype=PACKED), np.frombuffer(cents, dtype=PACKED))
+
+    rows = []
+    empty = np.empty(0, dtype=PACKED)
+    for card_id, usd in prices.items():
+        days, cents = stored.get(card_id, (empty, empty))
+        i = int(np.searchsorted(days, day))
+        if i < len(days) and days[i] == day:
+            cents = cents.copy()
+            cents[i] = to_cents(usd)
+        else:
+            days = np.insert(days, i, day)
+            cents = np.insert(cents, i, to_cents(usd))
+        rows.extend(series_rows(card_id, days, cents))
+    _write(conn, rows)
+
+
+def pick_resolution(conn, card_id, first, last):
+    # Finest resolution with at most MAX_POINTS points in [first, last]
+    import numpy as np
+    for resolution in RESOLUTIONS[:-1]:
+        row = conn.execute(
+            "SELECT days FROM PriceSeries WHERE card_id = ? AND resolution = ?", (card_id, resolution)
+        ).fetchone()
+        if row is None:
+            return resolution
+        days = np.frombuffer(row[0], dtype=PACKED)
+        if np.searchsorted(days, last, "right") - np.searchsorted(days, first) <= MAX_POINTS:
+            return resolution
+    return RESOLUTIONS[-1]
+
+
+def load_series(conn, card_id, start=None, end=None, resolution=None):
+    # Price series of one card between start and end (inclusive, ISO dates or
+    # None for open ends) as (datetime64[D] array, USD float array). With no
+    # resolution the finest one that fits in MAX_POINTS points is used.
+    import numpy as np
+    first = day_number(start) if start else np.iinfo(PACKED).min
+    last = day_number(end) if end else np.iinfo(PACKED).max
+    resolution = resolution or pick_resolution(conn, card_id, first, last)
+    row = conn.execute(
+        "SELECT days, cents FROM PriceSeries WHERE card_id = ? AND resolution = ?", (card_id, resolution)
+    ).fetchone()
+    if row is None:
+        return np.empty(0, dtype="datetime64[D]"), np.empty(0)
+    days = np.frombuffer(row[0], dtype=PACKED)
+    cents = np.frombuffer(row[1], dtype=PACKED)
+    lo, hi = np.searchsorted(days, first), np.searchsorted(days, last, "right")
+    return days[lo:hi].astype("datetime64[D]"), cents[lo:hi] / 100.0
@@ -0,0 +1,202 @@
+import json
+import queue
+import sqlite3
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from instrument import span
+from migrations import tune
+from search_index import fts_query
+
+# Runs the card list query for the GUI. Filter changes are debounced and
+# duplicate triggers collapsed, queries run on a background thread with their
+# own connection, and when the search text only grows the previous result set
+# is narrowed in memory instead of asking SQLite again.
+
+DEBOUNCE_MS = 150
+POLL_MS = 25
+# Results larger than this are not kept for in-memory narrowing
+NARROW_LIMIT = 20000
+
+# SQL used when sorting by a column heading
+SORT_COLUMNS = {
+    "Name": "Cards.card_name",
+    "Set": "Sets.code",
+    "Quantity": "Collection.quantity",
+    "Mana Cost": "Cards.mana_cost",
+    "Rarity": "Cards.rarity",
+}
+
+
+def like_escape(text):
+    # % and _ are matched literally, as the in-memory narrowing does
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def card_query(filter_text, set_code, rarity, sort_column=None, sort_desc=False):
+    # Search text goes through the FTS5 index (name, type line and oracle
+    # text); words too short for it fall back to a name LIKE
+    match = fts_query(filter_text)
+    if match:
+        query = """
+            SELECT Cards.card_id
+            FROM CardSearch
+            JOIN Cards ON Cards.card_id = CardSearch.rowid
+            JOIN Sets ON Cards.set_id = Sets.set_id
+            JOIN Collection ON Cards.card_id = Collection.card_id
+            WHERE CardSearch MATCH ?
+        """
+        params = [match]
+    else:
+        query = """
+            SELECT Cards.card_id
+            FROM Cards
+            JOIN Sets ON Cards.set_id = Sets.set_id
+            JOIN Collection ON Cards.card_id = Collection.card_id
+            WHERE Cards.card_name LIKE ? ESCAPE '\\'
+        """
+        params = [f"%{like_escape(filter_text)}%"]
+
+    if set_code != "All Sets":
+        query += " AND Sets.code = ?"
+        params.append(set_code)
+
+    if rarity != "All Rarities":
+        query += " AND Cards.rarity = ?"
+        params.append(rarity)
+
+    if sort_column:
+        direction = "DESC" if sort_desc else "ASC"
+        query += f" ORDER BY {SORT_COLUMNS[sort_column]} {direction}, Cards.card_name"
+    elif match:
+        # Rank name hits above type line hits above oracle text hits
+        query += " ORDER BY bm25(CardSearch, 10.0, 3.0, 1.0)"
+    else:
+        query += " ORDER BY Cards.card_name"
+
+    return query, params
+
+
+def narrow(old_filters, new_filters, ids, texts):
+    # Filter a previous result in memory when it is guaranteed to contain the
+    # new one: same set/rarity/sort and search text that only grew. Returns
+    # (ids, texts) or None when SQLite has to be asked again.
+    old_text, new_text = old_filters[0], new_filters[0]
+    if (texts is None or old_filters[1:] != new_filters[1:]
+            or new_text == old_text or not new_text.startswith(old_text)):
+        return None
+    # Filtering keeps the old order, which only matches a fresh query when
+    # both sort by a column or by name; bm25 ranks change with the search
+    if not new_filters[3] and fts_query(new_text):
+        return None
+
+    if fts_query(new_text):
+        # An FTS result only contains a name-LIKE result when the LIKE was empty
+        if not fts_query(old_text) and old_text.strip():
+            return None
+        words = new_text.lower().split()
+        keep = [i for i, hay in enumerate(texts) if all(w in hay[0] or w in hay[1] or w in hay[2] for w in words)]
+    else:
+        needle = new_text.lower()
+        keep = [i for i, hay in enumerate(texts) if needle in hay[0]]
+
+    return array("q", (ids[i] for i in keep)), [texts[i] for i in keep]
+
+
+def run_card_query(conn, filters):
+    # The card list query for a filters tuple: (ids, texts) where texts holds
+    # the lowercased searchable columns for in-memory narrowing, or None
+    # when the result is too large to keep
+    sql, params = card_query(*filters)
+    ids = array("q", (row[0] for row in conn.execute(sql, params)))
+
+    texts = None
+    if len(ids) <= NARROW_LIMIT:
+        rows = {
+            card_id: (name.lower(), type_line.lower(), oracle_text.lower())
+            for card_id, name, type_line, oracle_text in conn.execute("""
+                SELECT card_id, COALESCE(card_name, ''), COALESCE(type_line, ''), COALESCE(oracle_text, '')
+                FROM Cards WHERE card_id IN (SELECT value FROM json_each(?))
+            """, (json.dumps(ids.tolist()),))
+        }
+        texts = [rows[card_id] for card_id in ids]
+    return ids, texts
+
+
+class QueryController:
+    def __init__(self, root, db_path, on_result, delay_ms=DEBOUNCE_MS):
+        self.root = root
+        self.db_path = db_path
+        self.on_result = on_result
+        self.delay_ms = delay_ms
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query")
+        self.conn = None
+        self.done = queue.Queue()
+        self.after_id = None
+        self.pending = None
+        self.keep_position = False
+        self.generation = 0
+        self.dispatched = None
+        self.last = None  # (filters, ids, texts) of the newest result
+        self.queries = 0
+        self.narrowed = 0
+        self.collapsed = 0
+        root.after(POLL_MS, self._poll)
+
+    def request(self, filters, force=False, keep_position=False):
+        # filters: (search text, set code, rarity, sort column, sort descending);
+        # keep_position is handed to on_result for in-place refreshes
+        if force:
+            self.dispatched = self.last = None
+        if filters == self.pending or (self.pending is None and filters == self.dispatched):
+            self.collapsed += 1
+            return
+        self.pending = filters
+        self.keep_position = keep_position
+        if self.after_id:
+            self.root.after_cancel(self.after_id)
+        self.after_id = self.root.after(self.delay_ms, self._dispatch)
+
+    def _dispatch(self):
+        self.after_id = None
+        filters, self.pending = self.pending, None
+        self.dispatched = filters
+        self.generation += 1
+
+        if self.last:
+            with span("gui.narrow"):
+                narrowed = narrow(self.last[0], filters, self.last[1], self.last[2])
+            if narrowed is not None:
+                self.narrowed += 1
+                self._deliver(filters, *narrowed, self.keep_position)
+                return
+
+        self.executor.submit(self._run, self.generation, filters, self.keep_position)
+
+    def _run(self, generation, filters, keep_position):
+        # Worker thread; skip queries that were superseded before they started
+        if generation != self.generation:
+            return
+        if self.conn is None:
+            self.conn = tune(sqlite3.connect(self.db_path))
+        with span("gui.query"):
+            ids, texts = run_card_query(self.conn, filters)
+        self.queries += 1
+        self.done.put((generation, filters, ids, texts, keep_position))
+
+    def _poll(self):
+        while True:
+            try:
+                generation, filters, ids, texts, keep_position = self.done.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self.generation:
+                self._deliver(filters, ids, texts, keep_position)
+        self.root.after(POLL_MS, self._poll)
+
+    def _deliver(self, filters, ids, texts, keep_position):
+        self.last = (filters, ids, texts)
+        self.on_result(ids, keep_position)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,115 @@
+import json
+
+from catalog import find_card_id, upsert_card
+from collection_ledger import RECORD_SQL, SET_QUANTITY_SQL, card_history, compact_if_due, quantities_at
+from import_journal import now
+from migrations import DB_PATH, connect
+
+# Card and collection queries shared by the GUI, the importer and the batch
+# scripts, so none of them keeps its own SQL. Nothing here touches Tk or the
+# network; NumPy (price series, valuation) is only imported by the methods
+# that return arrays.
+
+
+class Repository:
+    def __init__(self, path=DB_PATH, conn=None):
+        # Opens (and migrates) the database at path unless a connection is given
+        self.path = path
+        self.conn = conn or connect(path)
+        self.cursor = self.conn.cursor()
+
+    def close(self):
+        self.conn.close()
+
+    def card_rows(self, card_ids):
+        # Display values for a window of owned card_ids, keyed by card_id:
+        # ((name, set code, quantity, mana cost, rarity), (card_id, image_url))
+        rows = self.conn.execute("""
+            SELECT Cards.card_id, Cards.card_name, Sets.code, Collection.quantity, Cards.mana_cost, Cards.rarity, Cards.image_url
+            FROM Cards
+            JOIN Sets ON Cards.set_id = Sets.set_id
+            JOIN Collection ON Cards.card_id = Collection.card_id
+            WHERE Cards.card_id IN (SELECT value FROM json_each(?))
+        """, (json.dumps(list(card_ids)),))
+        return {
+            card_id: ((name, set_code, quantity, mana_cost, rarity), (card_id, image_url))
+            for card_id, name, set_code, quantity, mana_cost, rarity, image_url in rows
+        }
+
+    def card_ids(self, filter_text="", set_code="All Sets", rarity="All Rarities"):
+        # card_ids of the owned cards matching the card list filters, in list order
+        from query_controller import card_query
+        query, params = card_query(filter_text, set_code, rarity)
+        return [row[0] for row in self.conn.execute(query, params)]
+
+    def collection_images(self):
+        # [(card_id, image_url)] of every owned card that has an image
+        return self.conn.execute("""
+            SELECT Cards.card_id, Cards.image_url FROM Collection
+            JOIN Cards ON Collection.card_id = Cards.card_id
+            WHERE Cards.image_url IS NOT NULL
+        """).fetchall()
+
+    def set_codes(self):
+        # Codes of the sets the collection has cards from, from the trigger-kept summary
+        return [row[0] for row in self.conn.execute("SELECT code FROM SetSummary ORDER BY code")]
+
+    def rarities(self):
+        return [row[0] for row in self.conn.execute(
+            "SELECT rarity FROM RaritySummary WHERE rarity != '' ORDER BY rarity"
+        )]
+
+    def totals(self):
+        # (owned cards, copies, sets) from a single summary row
+        return self.conn.execute("SELECT cards, copies, sets FROM CollectionTotals").fetchone() or (0, 0, 0)
+
+    def set_counts(self):
+        # [(set code, owned cards, copies)], most copies first
+        return self.conn.execute("SELECT code, cards, copies FROM SetSummary ORDER BY copies DESC, code").fetchall()
+
+    def rarity_counts(self):
+        # [(rarity or '', owned cards, copies)], most copies first
+        return self.conn.execute("SELECT rarity, cards, copies FROM RaritySummary ORDER BY copies DESC").fetchall()
+
+    def quantity(self, card_id):
+        row = self.conn.execute("SELECT quantity FROM Collection WHERE card_id = ?", (card_id,)).fetchone()
+        return row[0] if row else 0
+
+    # Collection changes are appended to CollectionLedger, whose trigger
+    # updates Collection in the same transaction (see collection_ledger.py)
+    def set_quantity(self, card_id, quantity, source="edit"):
+        self.conn.execute(SET_QUANTITY_SQL, (source, now(), card_id, quantity, card_id))
+        self.conn.commit()
+
+    def add_to_collection(self, card_id, quantity, source="add"):
+        self.conn.execute(RECORD_SQL, (card_id, quantity, source, now()))
+        self.conn.commit()
+
+    def card_history(self, card_id, limit=50):
+        # [(recorded_at, delta, source)] of one card, newest first
+        return card_history(self.conn, card_id, limit)
+
+    def quantities_at(self, when):
+        # {card_id: quantity} owned at a date or ISO timestamp
+        return quantities_at(self.conn, when)
+
+    def compact(self):
+        # Snapshot the ledger if enough entries piled up since the last one
+        return compact_if_due(self.conn)
+
+    def find_card_id(self, set_code, collector_number):
+        # card_id of a printing in the local catalog, or None
+        return find_card_id(self.cursor, set_code, collector_number)
+
+    def save_card(self, card):
+        # Write a Scryfall card to the catalog (committed with the next write)
+        return upsert_card(self.cursor, card)
+
+    def price_series(self, card_id, start=None, end=None, resolution=None):
+        # (datetime64[D] array, USD float array), see price_series.load_series
+        from price_series import load_series
+        return load_series(self.conn, card_id, start, end, resolution)
+
+    def collection_value(self, days=30):
+        from analytics import CollectionValue
+        return CollectionValue(self.conn, days)
@@ -0,0 +1,34 @@
+from scryfall import DEFAULT_WORKERS, FetchStats, resolve_cards
+
+# Turns (set code, collector number) into cards: the local catalog answers
+# first and only the misses go to Scryfall's /cards/collection, in batches.
+# Used by the importer for whole CSV files and by the GUI for single cards.
+
+
+class CardResolver:
+    def __init__(self, repository, stats=None):
+        self.repository = repository
+        self.stats = stats or FetchStats()
+        self.local_hits = 0
+
+    def resolve_rows(self, rows, key, workers=DEFAULT_WORKERS):
+        # key(row) -> (set_code, collector_number). Yields (row, card_id, card)
+        # in input order: card_id when the catalog already has the printing,
+        # otherwise the Scryfall card (not yet saved), or None for both when
+        # neither knows it. Rows missing the set or the number are not looked up.
+        located = ((row, self.repository.find_card_id(*key(row)) if all(key(row)) else None) for row in rows)
+        for (row, card_id), card in resolve_cards(
+            located, key=lambda r: None if r[1] is not None or not all(key(r[0])) else key(r[0]),
+            workers=workers, stats=self.stats
+        ):
+            if card_id is not None:
+                self.local_hits += 1
+            yield row, card_id, card
+
+    def resolve(self, set_code, collector_number):
+        # card_id of one printing, saving it to the catalog when it came from
+        # Scryfall; None when it does not exist
+        for _, card_id, card in self.resolve_rows([(set_code, collector_number)], key=lambda r: r, workers=1):
+            if card_id is None and card is not None:
+                card_id = self.repository.save_card(card)
+            return card_id
@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from http_cache import TTL_CARD, default_cache
+from http_client import default_client
+from instrument import span
+
+# Base URL can be pointed at a local stand-in such as fake_scryfall.py
+API_BASE = os.environ.get("SCRYFALL_API", "https://api.scryfall.com").rstrip("/")
+
+# Scryfall asks for 50-100 ms between requests, so stay around 10 per second
+DEFAULT_RATE = float(os.environ.get("SCRYFALL_RATE", 10))
+DEFAULT_WORKERS = int(os.environ.get("SCRYFALL_WORKERS", 8))
+# /cards/collection accepts at most 75 identifiers per request
+COLLECTION_BATCH = 75
+
+
+class TokenBucket:
+    # Thread-safe token bucket: `rate` tokens per second, at most `burst` saved up
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class FetchStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.finished = None
+        self.rows = 0
+        self.requests = 0
+        self.throttled = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    def count(self, field, amount=1):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def summary(self):
+        elapsed = (self.finished or time.monotonic()) - self.started
+        rate = self.rows / elapsed if elapsed > 0 else 0.0
+        return (f"📊 {self.rows} rows in {elapsed:.1f}s ({rate:.1f} rows/s), "
+                f"{self.requests} requests, {self.throttled} throttled, {self.failed} failed")
+
+
+def request(method, url, bucket, stats, **kwargs):
+    # Rate-limited request through the shared client, which retries 429s,
+    # server errors and timeouts; returns None when it failed for good
+    import requests
+
+    def before_attempt():
+        bucket.acquire()
+        stats.count("requests")
+
+    def on_retry(reason):
+        if reason == 429:
+            stats.count("throttled")
+
+    try:
+        return default_client().request(method, url, before_attempt, on_retry, **kwargs)
+    except requests.RequestException as e:
+        print(f"⚠️ Request failed: {url} ({e})")
+        stats.count("failed")
+        return None
+
+
+def card_url(set_code, collector_number):
+    return f"{API_BASE}/cards/{set_code}/{collector_number}"
+
+
+def fetch_batch(identifiers, bucket, stats, cached=True):
+    # Return one card (or None when not found) per identifier, in the same
+    # order. Cards cached by earlier runs are reused unless cached is False;
+    # the rest are POSTed to /cards/collection (at most COLLECTION_BATCH
+    # identifiers per call).
+    cache = default_cache()
+    cards = {identifier: cache.get_json(card_url(*identifier)) if cached else None for identifier in identifiers}
+    wanted = [identifier for identifier in identifiers if cards[identifier] is None]
+    if not wanted:
+        return [cards[identifier] for identifier in identifiers]
+
+    with span("scryfall.fetch"):
+        response = request(
+            "POST", f"{API_BASE}/cards/collection", bucket, stats,
+            json={"identifiers": [{"set": s, "collector_number": n} for s, n in wanted]},
+        )
+    if response is None or response.status_code != 200:
+        return [cards[identifier] for identifier in identifiers]
+
+    # Match cards to identifiers by their own set and collector number, not
+    # by position; an identifier no returned card carries counts as missing
+    found = {
+        (card.get("set", "").lower(), card.get("collector_number")): card
+        for card in response.json().get("data", [])
+    }
+    for set_code, collector_number in wanted:
+        card = found.get((set_code.lower(), collector_number))
+        if card is not None:
+            cards[(set_code, collector_number)] = card
+            cache.put_json(card_url(set_code, collector_number), card, TTL_CARD)
+    return [cards[identifier] for identifier in identifiers]
+
+
+def _batches(rows, key, batch_size, requested, max_rows=1000):
+    # Group rows so each batch asks for at most batch_size identifiers that no
+    # earlier batch asked for; `requested` collects them across the run. Rows
+    # whose key is None or was already requested just ride along in order.
+    rows_batch, identifiers = [], {}
+    for row in rows:
+        identifier = key(row)
+        if identifier in requested:
+            identifier = None
+        if (identifier is not None and identifier not in identifiers
+                and len(identifiers) == batch_size) or len(rows_batch) == max_rows:
+            requested.update(identifiers)
+            yield rows_batch, list(identifiers)
+            rows_batch, identifiers = [], {}
+        if identifier is not None:
+            identifiers.setdefault(identifier, None)
+        rows_batch.append(row)
+    if rows_batch:
+        requested.update(identifiers)
+        yield rows_batch, list(identifiers)
+
+
+def resolve_cards(rows, key, batch_size=COLLECTION_BATCH, workers=DEFAULT_WORKERS,
+                  rate=DEFAULT_RATE, stats=None, cached=True):
+    # Resolve a card for every row through /cards/collection, with at most
+    # `workers` batches in flight. `key(row)` returns (set_code, collector_number),
+    # or None for rows the caller has already resolved. Yields (row, card or None)
+    # in input order so results stream straight into the caller's DB writes.
+    # cached=False skips the card cache, for callers that need today's prices.
+    # Each identifier is requested once per run; repeats get the same card.
+    stats = stats or FetchStats()
+    bucket = TokenBucket(rate)
+    pending = deque()
+    requested = set()
+    cards = {}  # identifier -> card or None, filled as batches complete
+
+    def drain():
+        # Batches drain in order, so every identifier a row needs is in cards
+        rows_batch, identifiers, future = pending.popleft()
+        if future:
+            cards.update(zip(identifiers, future.result()))
+        for row in rows_batch:
+            stats.count("rows")
+            yield row, cards.get(key(row))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for rows_batch, identifiers in _batches(rows, key, batch_size, requested):
+            future = pool.submit(fetch_batch, identifiers, bucket, stats, cached) if identifiers else None
+            pending.append((rows_batch, identifiers, future))
+            if len(pending) >= workers * 2:
+                yield from drain()
+        while pending:
+            yield from drain()
+
+    stats.finished = time.monotonic()
+
+
+def resolve_card(set_code, collector_number):
+    # Single lookup through the same batch resolver; returns the card or None
+    for _, card in resolve_cards([(set_code, collector_number)], key=lambda r: r, workers=1):
+        return card
@@ -0,0 +1,62 @@
+# Full-text search over card name, type line and oracle text. CardSearch is an
+# external-content FTS5 table over Cards with a trigram tokenizer, so any
+# substring of three or more characters matches, like the old LIKE '%text%'
+# did, but through an index. Triggers on Cards keep it in sync.
+
+SEARCH_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS CardSearch USING fts5(
+    card_name, type_line, oracle_text,
+    content='Cards', content_rowid='card_id', tokenize='trigram'
+)
+"""
+
+TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS cards_search_insert AFTER INSERT ON Cards BEGIN
+        INSERT INTO CardSearch (rowid, card_name, type_line, oracle_text)
+        VALUES (new.card_id, new.card_name, new.type_line, new.oracle_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cards_search_delete AFTER DELETE ON Cards BEGIN
+        INSERT INTO CardSearch (CardSearch, rowid, card_name, type_line, oracle_text)
+        VALUES ('delete', old.card_id, old.card_name, old.type_line, old.oracle_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cards_search_update
+    AFTER UPDATE OF card_name, type_line, oracle_text ON Cards BEGIN
+        INSERT INTO CardSearch (CardSearch, rowid, card_name, type_line, oracle_text)
+        VALUES ('delete', old.card_id, old.card_name, old.type_line, old.oracle_text);
+        INSERT INTO CardSearch (rowid, card_name, type_line, oracle_text)
+        VALUES (new.card_id, new.card_name, new.type_line, new.oracle_text);
+    END
+    """,
+]
+
+# Trigram tokens are three characters long, so shorter words cannot be matched
+MIN_WORD = 3
+
+
+def ensure_search_index(conn):
+    conn.execute(SEARCH_SQL)
+    # Rebuilding Cards drops its triggers, and rows written while they were
+    # missing never reached the index, so rebuild it whenever they are absent
+    has_triggers = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'cards_search_%'"
+    ).fetchone()[0] == len(TRIGGERS_SQL)
+    if not has_triggers:
+        for sql in TRIGGERS_SQL:
+            conn.execute(sql)
+        conn.execute("INSERT INTO CardSearch (CardSearch) VALUES ('rebuild')")
+    conn.commit()
+
+
+def fts_query(text):
+    # Turn search box text into an FTS5 query matching every word anywhere in
+    # the indexed columns. Words are quoted so user input is never parsed as
+    # FTS5 syntax. Returns None when the index cannot serve the text.
+    words = text.split()
+    if not words or any(len(word) < MIN_WORD for word in words):
+        return None
+    return " ".join('"' + word.replace('"', '""') + '"' for word in words)
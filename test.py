@@ -1,26 +1,14 @@
-import sqlite3
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
-import requests
 from io import BytesIO
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
-
-# Connect to the SQLite database
-conn = sqlite3.connect("mtg_cards.db")
-cursor = conn.cursor()
-
-# Create a price history table if it doesn't exist
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS PriceHistory (
-        card_id INTEGER,
-        date TEXT,
-        usd_price REAL,
-        FOREIGN KEY (card_id) REFERENCES Cards(card_id)
-    )
-""")
-conn.commit()
+
+from detail_loader import load_price
+from repository import Repository
+
+# Pillow, requests and matplotlib are imported when a card is first selected
+
+# Connect to the SQLite database (creates/upgrades the schema)
+repository = Repository("mtg_cards.db")
 
 # Initialize the main window
 root = tk.Tk()
@@ -38,6 +26,7 @@ frame_right.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10, pady=10)
 # Frame to embed matplotlib price chart
 chart_frame = tk.Frame(frame_right)
 chart_frame.pack(fill=tk.BOTH, expand=False, pady=(10, 0))
+price_chart = None  # PriceChart, built on the first selection
 
 # Frame for filters
 filters_frame = ttk.Frame(frame_left)
@@ -85,43 +74,23 @@ tk.Button(editor_frame, text="💾 Save", command=lambda: update_quantity()).pac
 
 def populate_filters():
     # Populate set dropdown
-    cursor.execute("SELECT DISTINCT code FROM Sets ORDER BY code")
-    sets = ["All Sets"] + [row[0] for row in cursor.fetchall()]
+    sets = ["All Sets"] + repository.set_codes()
     set_dropdown['values'] = sets
     set_var.set("All Sets")
 
     # Populate rarity dropdown
-    cursor.execute("SELECT DISTINCT rarity FROM Cards WHERE rarity IS NOT NULL ORDER BY rarity")
-    rarities = ["All Rarities"] + [row[0] for row in cursor.fetchall()]
+    rarities = ["All Rarities"] + repository.rarities()
     rarity_dropdown['values'] = rarities
     rarity_var.set("All Rarities")
 
 def load_cards(filter_text=""):
     tree.delete(*tree.get_children())
-    
-    query = """
-        SELECT Cards.card_id, Cards.card_name, Sets.code, Collection.quantity,Cards.mana_cost, Cards.rarity, Cards.image_url
-        FROM Cards
-        JOIN Sets ON Cards.set_id = Sets.set_id
-        JOIN Collection ON Cards.card_id = Collection.card_id
-        WHERE Cards.card_name LIKE ?
-    """
-    params = [f"%{filter_text}%"]
-
-    if set_var.get() != "All Sets":
-        query += " AND Sets.code = ?"
-        params.append(set_var.get())
-
-    if rarity_var.get() != "All Rarities":
-        query += " AND Cards.rarity = ?"
-        params.append(rarity_var.get())
-
-    query += " ORDER BY Cards.card_name"
 
-    cursor.execute(query, params)
-    for row in cursor.fetchall():
-        card_id, name, set_code, quantity, mana_cost, rarity, image_url = row
-        tree.insert("", "end", values=(name, set_code, quantity, mana_cost, rarity), tags=(card_id, image_url))
+    card_ids = repository.card_ids(filter_text, set_var.get(), rarity_var.get())
+    rows = repository.card_rows(card_ids)
+    for card_id in card_ids:
+        values, tags = rows[card_id]
+        tree.insert("", "end", values=values, tags=tags)
 
 
 def on_card_select(event):
@@ -140,14 +109,16 @@ def on_card_select(event):
     show_price_chart(card_id)
 
     # Load quantity for editor
-    cursor.execute("SELECT quantity FROM Collection WHERE card_id = ?", (card_id,))
-    row = cursor.fetchone()
-    quantity_var.set(row[0] if row else 0)
+    quantity_var.set(repository.quantity(card_id))
+
+    from PIL import Image, ImageTk
+
+    from http_client import default_client
 
     # Load card image
     if image_url:
         try:
-            img_data = requests.get(image_url).content
+            img_data = default_client().get(image_url).content
             img = Image.open(BytesIO(img_data)).resize((250, 350))
             photo = ImageTk.PhotoImage(img)
             image_label.configure(image=photo, text="")
@@ -157,44 +128,22 @@ def on_card_select(event):
             print(e)
 
     # Fetch live price
-    cursor.execute("SELECT set_id FROM Cards WHERE card_id = ?", (card_id,))
-    set_id = cursor.fetchone()[0]
-    cursor.execute("SELECT code FROM Sets WHERE set_id = ?", (set_id,))
-    set_code = cursor.fetchone()[0]
-    cursor.execute("SELECT card_name FROM Cards WHERE card_id = ?", (card_id,))
-    card_name = cursor.fetchone()[0]
-
-    api_url = f"https://api.scryfall.com/cards/named?exact={card_name}&set={set_code}"
+    card_name, set_code = tree.item(selected, "values")[:2]
     try:
-        r = requests.get(api_url)
-        data = r.json()
-        price = data.get("prices", {}).get("usd")
+        price = load_price(card_name, set_code)
         price_label.config(text=f"💵 USD Price: ${price}" if price else "No price found.")
     except Exception as e:
         price_label.config(text="⚠️ Price fetch failed.")
         print(e)
 
 def show_price_chart(card_id):
-    # Clear existing chart
-    for widget in chart_frame.winfo_children():
-        widget.destroy()
-
-    cursor.execute("SELECT date, usd_price FROM PriceHistory WHERE card_id = ? ORDER BY date", (card_id,))
-    rows = cursor.fetchall()
-    if not rows:
-        return
-
-    dates, prices = zip(*rows)
-    fig, ax = plt.subplots(figsize=(4, 3))
-    ax.plot(dates, prices, marker='o')
-    ax.set_title("Price Over Time")
-    ax.set_xlabel("Date")
-    ax.set_ylabel("USD Price")
-    ax.tick_params(axis='x', rotation=45)
-
-    canvas = FigureCanvasTkAgg(fig, master=chart_frame)
-    canvas.draw()
-    canvas.get_tk_widget().pack()
+    # One chart for the whole session; each selection only swaps its data
+    global price_chart
+    if price_chart is None:
+        from price_chart import PriceChart
+        price_chart = PriceChart(chart_frame)
+    dates, prices = repository.price_series(card_id)
+    price_chart.show(dates, prices)
 
 def update_quantity():
     selected = tree.focus()
@@ -205,8 +154,7 @@ def update_quantity():
     card_id = int(tree.item(selected, "tags")[0])
     new_quantity = quantity_var.get()
 
-    cursor.execute("UPDATE Collection SET quantity = ? WHERE card_id = ?", (new_quantity, card_id))
-    conn.commit()
+    repository.set_quantity(card_id, new_quantity)
     load_cards(search_var.get())
     print(f"✅ Updated quantity to {new_quantity}")
 
@@ -0,0 +1,155 @@
+from array import array
+
+from instrument import span
+
+# Virtual list mode for a ttk.Treeview. The full result set is kept as a
+# compact array of card_ids; only the visible rows exist as Treeview items,
+# and their display values are fetched from SQLite a window at a time. The
+# Treeview's item count (and Tk's memory) stays fixed however many cards match.
+
+
+class VirtualTreeview:
+    def __init__(self, tree, scrollbar, fetch_rows, height, buffer=50, on_sort=None):
+        # fetch_rows(card_ids) returns {card_id: (values, tags)}
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fetch_rows = fetch_rows
+        self.height = height
+        self.buffer = buffer
+        self.on_sort = on_sort
+        self.ids = array("q")
+        self.offset = 0
+        self.rows = {}
+        self.selected_id = None
+        self.notified_id = None
+        self.sort_column = None
+        self.sort_desc = False
+        self.select_callbacks = []
+
+        self.slots = [tree.insert("", "end", iid=f"slot{i}") for i in range(height)]
+        for slot in self.slots:
+            tree.detach(slot)
+
+        # The scrollbar tracks the position in self.ids, not the Treeview items
+        scrollbar.configure(command=self.yview)
+        for col in tree["columns"]:
+            tree.heading(col, command=lambda c=col: self.sort(c))
+
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        tree.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, "units"))
+        tree.bind("<Button-4>", lambda e: self.scroll(-1, "units"))
+        tree.bind("<Button-5>", lambda e: self.scroll(1, "units"))
+        tree.bind("<Up>", lambda e: self.move_selection(-1))
+        tree.bind("<Down>", lambda e: self.move_selection(1))
+        tree.bind("<Prior>", lambda e: self.move_selection(-height))
+        tree.bind("<Next>", lambda e: self.move_selection(height))
+        tree.bind("<Home>", lambda e: self.move_selection(-len(self.ids)))
+        tree.bind("<End>", lambda e: self.move_selection(len(self.ids)))
+
+    def bind_select(self, callback):
+        # Use instead of binding <<TreeviewSelect>>: fires once per card the
+        # user selects, not for the selection shuffles caused by scrolling
+        self.select_callbacks.append(callback)
+
+    def set_ids(self, card_ids, keep_position=False):
+        # A new result starts at the top; keep_position holds the scroll
+        # offset for an in-place refresh of the same list
+        self.ids = array("q", card_ids)
+        self.rows = {}
+        self.offset = min(self.offset, max(0, len(self.ids) - self.height)) if keep_position else 0
+        self.render()
+
+    def refresh(self):
+        # Re-read the visible rows (e.g. after a quantity change)
+        self.rows = {}
+        self.render()
+
+    def card_at(self, slot):
+        index = self.offset + self.slots.index(slot)
+        return self.ids[index] if index < len(self.ids) else None
+
+    def render(self):
+        window = self.ids[self.offset:self.offset + self.height]
+        if any(card_id not in self.rows for card_id in window):
+            start = max(0, self.offset - self.buffer)
+            with span("gui.rows_fetch"):
+                self.rows = self.fetch_rows(self.ids[start:self.offset + self.height + self.buffer].tolist())
+
+        selected_slot = None
+        with span("gui.tree_update"):
+            for slot, card_id in zip(self.slots, window):
+                values, tags = self.rows[card_id]
+                self.tree.item(slot, values=values, tags=tags)
+                self.tree.move(slot, "", "end")
+                if card_id == self.selected_id:
+                    selected_slot = slot
+            for slot in self.slots[len(window):]:
+                self.tree.detach(slot)
+
+        if selected_slot:
+            self.tree.selection_set(selected_slot)
+            self.tree.focus(selected_slot)
+        else:
+            self.tree.selection_set(())
+            self.tree.focus("")
+
+        total = len(self.ids)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.height) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, len(self.ids) - self.height))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def scroll(self, amount, what):
+        self.scroll_to(self.offset + amount * (self.height if what == "pages" else 1))
+        return "break"
+
+    def yview(self, *args):
+        # Scrollbar protocol: ("moveto", fraction) or ("scroll", n, "units"|"pages")
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.ids)))
+        elif args[0] == "scroll":
+            self.scroll(int(args[1]), args[2])
+
+    def move_selection(self, step):
+        if not self.ids:
+            return "break"
+        focus = self.tree.focus()
+        index = self.offset + self.slots.index(focus) + step if focus else self.offset
+        index = max(0, min(len(self.ids) - 1, index))
+        if index < self.offset:
+            self.offset = index
+        elif index >= self.offset + self.height:
+            self.offset = index - self.height + 1
+        self.selected_id = self.ids[index]
+        self.render()
+        return "break"
+
+    def sort(self, column):
+        if self.sort_column == column:
+            self.sort_desc = not self.sort_desc
+        else:
+            self.sort_column, self.sort_desc = column, False
+        for col in self.tree["columns"]:
+            arrow = (" ▼" if self.sort_desc else " ▲") if col == column else ""
+            self.tree.heading(col, text=col + arrow)
+        self.offset = 0
+        if self.on_sort:
+            self.on_sort()
+
+    def _on_select(self, event):
+        selection = self.tree.selection()
+        if not selection:
+            return
+        card_id = self.card_at(selection[0])
+        self.selected_id = card_id
+        if card_id is None or card_id == self.notified_id:
+            return
+        self.notified_id = card_id
+        for callback in self.select_callbacks:
+            callback(event)